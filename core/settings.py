@@ -10,9 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,16 +48,54 @@ INSTALLED_APPS += OTHER_INSTALLED_APPS
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "project.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "project.middleware.ProfilingMiddleware",
+    "project.middleware.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
 ROOT_URLCONF = "core.urls"
 
+# API rendering: orjson-backed JSON by default, MessagePack for clients
+# sending "Accept: application/msgpack" (only when msgpack is installed)
+API_RENDERER_CLASSES = [
+    "project.renderers.ORJSONRenderer",
+    "rest_framework.renderers.BrowsableAPIRenderer",
+]
+if find_spec("msgpack"):
+    API_RENDERER_CLASSES.append("project.renderers.MessagePackRenderer")
+
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": API_RENDERER_CLASSES,
+    "DEFAULT_THROTTLE_RATES": {
+        # per-client rate of enrichment-triggering creates
+        "enrichment": config("ENRICHMENT_RATE", default="30/min"),
+    },
+}
+
+# The enrichment throttle keeps its request history in the database so the
+# rate holds per client across all workers; the default per-process
+# LocMemCache would allow ENRICHMENT_RATE per worker. The table is created
+# by migration 0014 (or `manage.py createcachetable`).
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "throttle": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "project_throttle_cache"},
+}
+
+# Response compression (brotli is used when installed and accepted)
+COMPRESSION_MIN_SIZE = config("COMPRESSION_MIN_SIZE", default=512, cast=int)
+COMPRESSION_GZIP_LEVEL = config("COMPRESSION_GZIP_LEVEL", default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config("COMPRESSION_BROTLI_QUALITY", default=5, cast=int)
+# Only API payloads are compressed: HTML pages carry CSRF tokens, and
+# compressing them without padding would expose those to BREACH
+COMPRESSION_CONTENT_TYPES = ["application/json", "application/msgpack"]
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -81,12 +120,83 @@ WSGI_APPLICATION = "core.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# DB_PROFILE selects the backend: "sqlite" (default) or "postgres"
+
+DB_PROFILE = config("DB_PROFILE", default="sqlite")
+DB_CONN_MAX_AGE = config("DB_CONN_MAX_AGE", default=600, cast=int)
+
+if DB_PROFILE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": config("POSTGRES_DB", default="phantomnoir"),
+            "USER": config("POSTGRES_USER", default="postgres"),
+            "PASSWORD": config("POSTGRES_PASSWORD", default=""),
+            "HOST": config("POSTGRES_HOST", default="localhost"),
+            "PORT": config("POSTGRES_PORT", default="5432"),
+            "CONN_HEALTH_CHECKS": True,
+        }
     }
-}
+    if config("POSTGRES_POOL", default=True, cast=bool):
+        # psycopg's pool keeps the connections open, so Django must not (CONN_MAX_AGE=0)
+        DATABASES["default"]["OPTIONS"] = {
+            "pool": {
+                "min_size": config("POSTGRES_POOL_MIN_SIZE", default=2, cast=int),
+                "max_size": config("POSTGRES_POOL_MAX_SIZE", default=10, cast=int),
+                "timeout": config("POSTGRES_POOL_TIMEOUT", default=10, cast=float),
+            },
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = DB_CONN_MAX_AGE
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": config("SQLITE_PATH", default=str(BASE_DIR / "db.sqlite3")),
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            # a file rather than the shared in-memory database, whose table
+            # locks fail the tests that send concurrent requests
+            "TEST": {"NAME": str(BASE_DIR / "test_db.sqlite3")},
+        }
+    }
+    if config("SQLITE_TUNED", default=True, cast=bool):
+        # WAL lets readers run alongside the single writer; IMMEDIATE takes the
+        # write lock up front so read-then-write transactions wait on the busy
+        # timeout instead of failing with "database is locked".
+        DATABASES["default"]["OPTIONS"] = {
+            "timeout": config("SQLITE_BUSY_TIMEOUT", default=20, cast=float),
+            "transaction_mode": "IMMEDIATE",
+            "init_command": (
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA temp_store=MEMORY;"
+                "PRAGMA cache_size=-20000;"
+                "PRAGMA mmap_size=134217728;"
+            ),
+        }
+
+# Read replicas: safe-method requests read from these aliases round-robin,
+# writes stay on "default". Locally, point SQLITE_REPLICA_PATHS at copies of
+# the default SQLite file (e.g. SQLITE_REPLICA_PATHS=replica1.sqlite3).
+if DB_PROFILE == "postgres":
+    replica_settings = [
+        {"HOST": host} for host in config("POSTGRES_REPLICA_HOSTS", default="", cast=Csv())
+    ]
+else:
+    replica_settings = [
+        {"NAME": path} for path in config("SQLITE_REPLICA_PATHS", default="", cast=Csv())
+    ]
+for index, overrides in enumerate(replica_settings, start=1):
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        **overrides,
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["project.routers.PrimaryReplicaRouter"]
+REPLICA_STICKINESS_SECONDS = config("REPLICA_STICKINESS_SECONDS", default=5, cast=float)
+REPLICA_PIN_COOKIE = "db_pin_primary"
 
 
 # Password validation
@@ -127,6 +237,14 @@ STATIC_URL = "static/"
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# whitenoise serves the collected files with hashed names, gzip/brotli
+# variants written at collectstatic time and immutable cache headers
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -134,4 +252,91 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 OMDB_API_KEY = config("OMDB_API_KEY")
-TMDB_API_KEY = config("TMDB_API_KEY")
\ No newline at end of file
+TMDB_API_KEY = config("TMDB_API_KEY")
+
+# Provider endpoints; point them at `manage.py simulate_providers` to work offline
+JIKAN_BASE_URL = config("JIKAN_BASE_URL", default="https://api.jikan.moe/v4")
+TMDB_BASE_URL = config("TMDB_BASE_URL", default="https://api.themoviedb.org/3")
+OMDB_BASE_URL = config("OMDB_BASE_URL", default="http://www.omdbapi.com/")
+
+# Concurrent enrichments of the same title share one upstream fetch
+SINGLE_FLIGHT_WAIT_TIMEOUT = config("SINGLE_FLIGHT_WAIT_TIMEOUT", default=30, cast=float)
+SINGLE_FLIGHT_RESULT_TTL = config("SINGLE_FLIGHT_RESULT_TTL", default=10, cast=float)
+SINGLE_FLIGHT_POLL_INTERVAL = 0.1
+
+# Bulk PATCH/PUT endpoints
+BULK_UPDATE_MAX_ITEMS = config("BULK_UPDATE_MAX_ITEMS", default=500, cast=int)
+
+# /changes/ feed
+CHANGE_FEED_PAGE_SIZE = config("CHANGE_FEED_PAGE_SIZE", default=500, cast=int)
+CHANGE_FEED_MAX_PAGE_SIZE = 1000
+# Entries younger than this many seconds are held back. Postgres allocates
+# seq at insert time, so a slow transaction can commit a seq lower than one
+# a client already read past; the lag must exceed the longest write
+# transaction (e.g. a bulk update). SQLite serializes writers, so commit
+# order is seq order there and no lag is needed.
+CHANGE_FEED_SAFETY_LAG = config(
+    "CHANGE_FEED_SAFETY_LAG", default=5 if DB_PROFILE == "postgres" else 0, cast=float
+)
+
+# manage.py warm_cache / gunicorn post-fork warm-up
+CACHE_WARM_PREFIXES = ["/anime_series/", "/movie/", "/anime_ui/", "/movie_ui/", "/autocomplete/", "/similar/"]
+CACHE_WARM_PATHS = [
+    "/anime_series/",
+    "/anime_series/?page=2",
+    "/movie/",
+    "/movie/?page=2",
+    "/anime_ui/",
+    "/anime_ui/?page=2",
+    "/movie_ui/",
+    "/movie_ui/?page=2",
+]
+CACHE_WARM_LOG = config("CACHE_WARM_LOG", default="")
+CACHE_WARM_TOP = config("CACHE_WARM_TOP", default=50, cast=int)
+CACHE_WARM_WORKERS = config("CACHE_WARM_WORKERS", default=8, cast=int)
+CACHE_WARM_HOST = config("CACHE_WARM_HOST", default="localhost")
+
+# "More like this" similarity index
+SIMILARITY_INDEX_DIR = config("SIMILARITY_INDEX_DIR", default=str(BASE_DIR / "var" / "similarity"))
+SIMILARITY_TOP_K = 10
+SIMILARITY_YEAR_WEIGHT = 0.2
+SIMILARITY_YEAR_SCALE = 5.0
+SIMILARITY_UI_LIMIT = 4
+
+# /autocomplete/ typeahead index
+AUTOCOMPLETE_MAX_ENTRIES = config("AUTOCOMPLETE_MAX_ENTRIES", default=100000, cast=int)
+AUTOCOMPLETE_KEY_LENGTH = 64
+AUTOCOMPLETE_MAX_SCAN = 256
+AUTOCOMPLETE_MAX_LIMIT = 20
+AUTOCOMPLETE_VERSION_CHECK = 2.0
+AUTOCOMPLETE_MAX_CATCH_UP = 1000
+AUTOCOMPLETE_REBUILD_INTERVAL = config("AUTOCOMPLETE_REBUILD_INTERVAL", default=300, cast=int)
+
+# Admission control for enrichment-triggering creates (shared by all workers)
+ENRICHMENT_MAX_IN_FLIGHT = config("ENRICHMENT_MAX_IN_FLIGHT", default=4, cast=int)
+ENRICHMENT_LEASE_TTL = config("ENRICHMENT_LEASE_TTL", default=120, cast=int)
+ENRICHMENT_RETRY_AFTER = config("ENRICHMENT_RETRY_AFTER", default=5, cast=int)
+
+# Admin
+ENRICHMENT_BACKGROUND_WORKERS = config("ENRICHMENT_BACKGROUND_WORKERS", default=2, cast=int)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+# Idempotency-Key replays of POST /anime_series/ and /movie/
+IDEMPOTENCY_KEY_TTL = config("IDEMPOTENCY_KEY_TTL", default=86400, cast=int)
+
+# On-demand profiling of staff requests sent with "X-Profile: 1|sample"
+PROFILING_ENABLED = config("PROFILING_ENABLED", default=True, cast=bool)
+PROFILE_DIR = config("PROFILE_DIR", default=str(BASE_DIR / "var" / "profiles"))
+PROFILE_KEEP = config("PROFILE_KEEP", default=50, cast=int)
+PROFILE_SAMPLE_INTERVAL = 0.001
+
+# ?ids=1,2,3 multi-get on /anime_series/ and /movie/
+MULTI_GET_MAX_IDS = config("MULTI_GET_MAX_IDS", default=100, cast=int)
+
+# ?expand=movies on /anime_series/: movies embedded per series
+EXPAND_MOVIES_LIMIT = config("EXPAND_MOVIES_LIMIT", default=20, cast=int)
+
+# UI assets built by `manage.py build_assets`
+TAILWIND_CLI = config("TAILWIND_CLI", default="npx --yes tailwindcss@3.4.17")
+UI_FONT_CSS_URL = "https://fonts.googleapis.com/css2?family=Plus+Jakarta+Sans:wght@200..800&display=swap"
+UI_FONT_SUBSETS = ["latin", "latin-ext"]
@@ -0,0 +1,12 @@
+import os
+
+# Set WARM_CACHE_ON_START=1 to have each worker load its autocomplete and
+# similarity indexes and replay the hot URLs (CACHE_WARM_LOG or
+# CACHE_WARM_PATHS) before it accepts traffic.
+
+
+def post_worker_init(worker):
+    if os.environ.get("WARM_CACHE_ON_START") == "1":
+        from project.warmup import warm_from_settings
+
+        warm_from_settings()
@@ -1,6 +1,85 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Series, Genre, Movie
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+from .models import Series, Genre, Movie, normalize_title
+from .utils import schedule_enrichment
 
-admin.site.register(Series)
-admin.site.register(Movie)
-admin.site.register(Genre)
+
+class EstimatedCountPaginator(Paginator):
+    # Unfiltered changelists of big tables use the planner's row estimate
+    # (or MAX(id) on SQLite) instead of a full COUNT(*).
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_rows(queryset)
+            if estimate and estimate > settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+def estimate_rows(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+    if connection.vendor == "sqlite":
+        return queryset.model.objects.using(queryset.db).aggregate(top=Max("pk"))["top"]
+    return None
+
+
+class PrefixSearchMixin:
+    # Match the whole term as a title prefix instead of the default per-word
+    # icontains scan over every row. The prefix is a range over the already
+    # casefolded normalized_name, which the (normalized_name, release_year)
+    # unique index serves; istartswith could not use an index.
+
+    def get_search_results(self, request, queryset, search_term):
+        prefix = normalize_title(search_term)
+        if not prefix:
+            return queryset, False
+        return queryset.filter(normalized_name__gte=prefix, normalized_name__lt=prefix + "\uffff"), False
+
+
+@admin.action(description="Re-enrich selected from providers (in background)")
+def re_enrich(modeladmin, request, queryset):
+    pks = list(queryset.values_list("pk", flat=True))
+    schedule_enrichment(queryset.model, pks)
+    modeladmin.message_user(request, f"Scheduled re-enrichment of {len(pks)} item(s).")
+
+
+@admin.register(Series)
+class SeriesAdmin(PrefixSearchMixin, admin.ModelAdmin):
+    list_display = ["name", "release_year", "updated_at"]
+    search_fields = ["name"]
+    autocomplete_fields = ["genre"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [re_enrich]
+
+
+@admin.register(Movie)
+class MovieAdmin(PrefixSearchMixin, admin.ModelAdmin):
+    list_display = ["movie_name", "series", "release_year", "updated_at"]
+    list_select_related = ["series"]
+    search_fields = ["movie_name"]
+    autocomplete_fields = ["series", "genre"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [re_enrich]
+
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    # no normalized_name to prefix-search; the default search suits a small table
+    search_fields = ["name"]
+    ordering = ["name"]
@@ -0,0 +1,98 @@
+import os
+import random
+import threading
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import SimpleRateThrottle
+
+from .models import AdmissionLease
+
+# Creates fan out to four provider calls, so they are admitted separately
+# from reads: a per-client rate (EnrichmentRateThrottle) and a global cap on
+# in-flight enrichments shared by all workers through AdmissionLease slots.
+
+_counters = {"admitted": 0, "rejected_capacity": 0, "rejected_rate": 0, "in_flight": 0}
+_counters_lock = threading.Lock()
+
+
+def count(name, delta=1):
+    with _counters_lock:
+        _counters[name] += delta
+
+
+def stats():
+    with _counters_lock:
+        local = dict(_counters)
+    return {
+        "pid": os.getpid(),
+        "process": local,
+        "global_in_flight": AdmissionLease.objects.count(),
+        "max_in_flight": settings.ENRICHMENT_MAX_IN_FLIGHT,
+    }
+
+
+class EnrichmentRateThrottle(SimpleRateThrottle):
+    # shared by all workers, see CACHES
+    cache = caches["throttle"]
+    scope = "enrichment"
+
+    def get_cache_key(self, request, view):
+        if request.method != "POST":
+            return None
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def throttle_failure(self):
+        count("rejected_rate")
+        return False
+
+
+def acquire_slot():
+    now = timezone.now()
+    AdmissionLease.objects.filter(
+        acquired_at__lt=now - timedelta(seconds=settings.ENRICHMENT_LEASE_TTL)
+    ).delete()
+
+    taken = set(AdmissionLease.objects.values_list("slot", flat=True))
+    free = [slot for slot in range(settings.ENRICHMENT_MAX_IN_FLIGHT) if slot not in taken]
+    random.shuffle(free)
+    for slot in free:
+        try:
+            with transaction.atomic():
+                return AdmissionLease.objects.create(slot=slot, acquired_at=now)
+        except IntegrityError:
+            continue
+    return None
+
+
+def admission_controlled(view_method):
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        lease = acquire_slot()
+        if lease is None:
+            count("rejected_capacity")
+            return Response(
+                {"error": "Too many enrichments in progress, retry later"},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(settings.ENRICHMENT_RETRY_AFTER)},
+            )
+
+        count("admitted")
+        count("in_flight")
+        try:
+            return view_method(self, request, *args, **kwargs)
+        finally:
+            count("in_flight", -1)
+            AdmissionLease.objects.filter(pk=lease.pk).delete()
+
+    return wrapper
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProjectConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "project"
+
+    def ready(self):
+        from . import checks, readmodel, signals  # noqa: F401
+
+        post_migrate.connect(readmodel.backfill, sender=self)
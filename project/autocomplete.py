@@ -0,0 +1,216 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+from .models import ChangeLog, Movie, Series, normalize_title
+
+KINDS = (None, "series", "movie")
+
+
+def rank_key(entry):
+    kind, pk, title, _, weight = entry
+    return -weight, title, kind, pk
+
+
+class Overlay:
+    """Rows written since the index was built: the (kind, pk) pairs whose
+    built entry is outdated or deleted, and the current entries with their
+    own sorted (key, kind, pk) list. Replaced, never mutated, so searches
+    running while the change log is applied see one consistent state."""
+
+    def __init__(self, stale=frozenset(), fresh=None, keys=()):
+        self.stale = stale
+        self.fresh = fresh or {}
+        self.keys = keys
+
+    def matching(self, prefix, kind=None):
+        lo = bisect_left(self.keys, (prefix,))
+        hi = bisect_left(self.keys, (prefix + "\uffff",), lo)
+        return {self.fresh[key[1:]] for key in self.keys[lo:hi] if kind in (None, key[1])}
+
+
+class TypeaheadIndex:
+    """Prefix index over normalized titles.
+
+    Every word start of a title is a key ("attack on titan", "on titan",
+    "titan"), kept in one sorted list with a parallel list of entry numbers,
+    so a prefix is two bisects away. Entries are numbered best first, which
+    makes ranking a match set taking its smallest numbers; prefixes matching
+    more than AUTOCOMPLETE_MAX_SCAN keys have their best entries ranked at
+    build time, so a lookup never ranks more than that many.
+    Entries are (kind, pk, title, release_year, weight); weight is the
+    franchise size, the only popularity signal the catalog has.
+    """
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=rank_key)
+        pairs = sorted(
+            (key, number)
+            for number, entry in enumerate(self.entries)
+            for key in self.keys_for(entry[2])
+        )
+        self.keys = [key for key, _ in pairs]
+        self.numbers = [number for _, number in pairs]
+        self.ranked = {}
+        self.rank_broad_prefixes()
+        self.overlay = Overlay()
+
+    @staticmethod
+    def keys_for(title):
+        words = normalize_title(title)[: settings.AUTOCOMPLETE_KEY_LENGTH].split(" ")
+        return {" ".join(words[i:]) for i in range(len(words))}
+
+    def rank_broad_prefixes(self):
+        # a prefix's keys split into those of its one-character-longer
+        # prefixes, so only the spans of broad prefixes need splitting further
+        spans, length = [(0, len(self.keys))], 0
+        while spans:
+            length += 1
+            broad = []
+            for lo, hi in spans:
+                while lo < hi:
+                    key = self.keys[lo]
+                    if len(key) < length:
+                        lo = bisect_right(self.keys, key, lo, hi)
+                        continue
+                    prefix = key[:length]
+                    end = bisect_right(self.keys, prefix + "\uffff", lo, hi)
+                    if end - lo > settings.AUTOCOMPLETE_MAX_SCAN:
+                        numbers = set(self.numbers[lo:end])
+                        self.ranked[prefix] = {
+                            kind: self.rank(numbers, settings.AUTOCOMPLETE_MAX_LIMIT, kind) for kind in KINDS
+                        }
+                        broad.append((lo, end))
+                    lo = end
+            spans = broad
+
+    def matching(self, prefix):
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_right(self.keys, prefix + "\uffff", lo)
+        return set(self.numbers[lo:hi])
+
+    def rank(self, numbers, limit, kind=None, stale=frozenset()):
+        entries = self.entries
+        if kind is not None:
+            numbers = (n for n in numbers if entries[n][0] == kind)
+        if stale:
+            numbers = (n for n in numbers if entries[n][:2] not in stale)
+        return heapq.nsmallest(limit, numbers)
+
+    def search(self, query, limit, kind=None):
+        prefix = normalize_title(query)
+        if not prefix:
+            return []
+        overlay = self.overlay
+        ranked = self.ranked.get(prefix, {}).get(kind)
+        if ranked is None:
+            ranked = self.rank(self.matching(prefix), limit, kind, overlay.stale)
+        elif overlay.stale:
+            live = [n for n in ranked if self.entries[n][:2] not in overlay.stale]
+            if len(live) < limit and len(ranked) == settings.AUTOCOMPLETE_MAX_LIMIT:
+                # outdated entries pushed some of the best out of the precomputed top
+                live = self.rank(self.matching(prefix), limit, kind, overlay.stale)
+            ranked = live
+        matches = [self.entries[n] for n in ranked[:limit]]
+        if overlay.fresh:
+            matches = heapq.nsmallest(limit, matches + list(overlay.matching(prefix, kind)), key=rank_key)
+        return matches
+
+    def apply(self, changed, entries):
+        """Overlay the changed (kind, pk) pairs; entries are the current ones
+        of those that still exist (and of any other row worth refreshing)."""
+        overlay = self.overlay
+        changed = changed | {entry[:2] for entry in entries}
+        fresh = {pair: entry for pair, entry in overlay.fresh.items() if pair not in changed}
+        fresh.update((entry[:2], entry) for entry in entries)
+        keys = sorted((key, *pair) for pair, entry in fresh.items() for key in self.keys_for(entry[2]))
+        self.overlay = Overlay(overlay.stale | changed, fresh, keys)
+
+
+def load_entries(changed=None):
+    """Entries of the whole catalog, or of the changed (kind, pk) pairs that
+    still exist plus the franchises of the changed movies."""
+    series = Series.objects.all()
+    movies = Movie.objects.all()
+    if changed is not None:
+        movies = movies.filter(pk__in=[pk for kind, pk in changed if kind == "movie"])
+    movies = list(movies.values_list("pk", "movie_name", "release_year", "series_id"))
+    if changed is not None:
+        # a changed movie may have joined or left a franchise, whose size is its weight
+        wanted = {pk for kind, pk in changed if kind == "series"} | {series_id for *_, series_id in movies}
+        wanted.discard(None)
+        series = series.filter(pk__in=wanted)
+
+    series = series.annotate(weight=Count("movies")).values_list("pk", "name", "release_year", "weight")
+    entries = [("series", pk, name, year, 1 + weight) for pk, name, year, weight in series]
+    franchise = {pk: weight for _, pk, _, _, weight in entries}
+    entries += [("movie", pk, name, year, franchise.get(series_id, 1)) for pk, name, year, series_id in movies]
+
+    entries.sort(key=lambda entry: -entry[4])
+    return entries[: settings.AUTOCOMPLETE_MAX_ENTRIES]
+
+
+def current_version():
+    return ChangeLog.objects.order_by("-seq").values_list("seq", flat=True).first() or 0
+
+
+_index = None
+_version = None
+_built_at = 0.0
+_checked_at = 0.0
+_rebuilding = False
+_lock = threading.Lock()
+
+
+def get_index():
+    """Return the index, applying the change log to it at most every
+    AUTOCOMPLETE_VERSION_CHECK s. Full rebuilds run in the background, at
+    most every AUTOCOMPLETE_REBUILD_INTERVAL s or when more than
+    AUTOCOMPLETE_MAX_CATCH_UP changes are waiting."""
+    global _checked_at
+    if _index is not None and time.monotonic() - _checked_at < settings.AUTOCOMPLETE_VERSION_CHECK:
+        return _index
+
+    with _lock:
+        _checked_at = time.monotonic()
+        if _index is None:
+            rebuild(current_version())
+        elif not _rebuilding:
+            catch_up()
+    return _index
+
+
+def catch_up():
+    global _version, _rebuilding
+    limit = settings.AUTOCOMPLETE_MAX_CATCH_UP
+    changes = list(ChangeLog.objects.filter(seq__gt=_version).values_list("seq", "kind", "object_id")[: limit + 1])
+    if not changes:
+        return
+    if len(changes) > limit or time.monotonic() - _built_at >= settings.AUTOCOMPLETE_REBUILD_INTERVAL:
+        _rebuilding = True
+        threading.Thread(target=rebuild_in_background, args=(current_version(),), daemon=True).start()
+        return
+    changed = {(kind, pk) for _, kind, pk in changes}
+    _index.apply(changed, load_entries(changed))
+    _version = changes[-1][0]
+
+
+def rebuild(version):
+    global _index, _version, _built_at
+    _built_at = time.monotonic()
+    _index = TypeaheadIndex(load_entries())
+    _version = version
+
+
+def rebuild_in_background(version):
+    global _rebuilding
+    try:
+        rebuild(version)
+    finally:
+        _rebuilding = False
+        connection.close()
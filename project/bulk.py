@@ -0,0 +1,163 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.utils import timezone
+
+from . import readmodel, similarity
+from .models import ChangeLog, Genre, Movie, Series, normalize_title
+from .serializers import DUPLICATE_TITLE_ERROR, PrefetchedPrimaryKeyRelatedField
+
+
+def bulk_update_objects(model, serializer_class, items, partial):
+    """Validate ``[{id, ...fields}]`` with ``serializer_class`` and apply every
+    valid item in one transaction. Returns (results, error)."""
+    if not isinstance(items, list) or not items:
+        return None, {"error": "Expected a non-empty list of objects"}
+    if len(items) > settings.BULK_UPDATE_MAX_ITEMS:
+        return None, {"error": f"At most {settings.BULK_UPDATE_MAX_ITEMS} items per request"}
+
+    results = [None] * len(items)
+    ids = []
+    for index, item in enumerate(items):
+        pk = item.get("id") if isinstance(item, dict) else None
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            results[index] = {"id": pk, "status": "invalid", "errors": {"id": ["A valid integer is required."]}}
+        else:
+            ids.append(pk)
+
+    objects = model.objects.in_bulk(ids)
+    context = {"prefetched": prefetch_related_pks(serializer_class, items)}
+    valid = []
+    for index, item in enumerate(items):
+        if results[index] is not None:
+            continue
+        obj = objects.get(item["id"])
+        if obj is None:
+            results[index] = {"id": item["id"], "status": "not_found"}
+            continue
+        data = {key: value for key, value in item.items() if key != "id"}
+        serializer = serializer_class(obj, data=data, partial=partial, context=context)
+        if serializer.is_valid():
+            valid.append((index, obj, dict(serializer.validated_data)))
+        else:
+            results[index] = {"id": obj.pk, "status": "invalid", "errors": serializer.errors}
+
+    changed_fields = {"updated_at"}
+    genre_updates = {}
+    today = timezone.now().date()
+    for index, obj, data in valid:
+        genres = data.pop("genre", None)
+        title_field = "name" if model is Series else "movie_name"
+        if title_field in data and data[title_field] != getattr(obj, title_field):
+            # as in Model.save(), an unchanged title keeps its normalized_name
+            obj.normalized_name = normalize_title(data[title_field])
+            changed_fields.add("normalized_name")
+        for key, value in data.items():
+            setattr(obj, key, value)
+            changed_fields.add(key)
+        obj.updated_at = today
+        if genres is not None:
+            genre_updates[obj.pk] = genres
+
+    # A title + year clash would fail the whole UPDATE, so the clashing items
+    # are rejected up front. A row another request commits in between can
+    # still fail it; the check then runs once more against that row.
+    for attempt in range(2):
+        clashes = title_clashes(model, [obj for _, obj, _ in valid])
+        for index, obj, _ in valid:
+            if obj.pk in clashes:
+                results[index] = {"id": obj.pk, "status": "invalid", "errors": {"error": [DUPLICATE_TITLE_ERROR]}}
+        valid = [(index, obj, data) for index, obj, data in valid if obj.pk not in clashes]
+        if not valid:
+            break
+        try:
+            apply_updates(model, [obj for _, obj, _ in valid], changed_fields, genre_updates)
+            break
+        except IntegrityError:
+            if attempt:
+                return None, {"error": "The update would give two records the same title and release year"}
+
+    for index, obj, _ in valid:
+        results[index] = {"id": obj.pk, "status": "updated"}
+    return results, None
+
+
+def prefetch_related_pks(serializer_class, items):
+    """{model: {pk: obj}} of the objects the items point to through
+    PrefetchedPrimaryKeyRelatedFields, fetched once for the batch."""
+    prefetched = {}
+    for name, field in serializer_class().fields.items():
+        if isinstance(field, PrefetchedPrimaryKeyRelatedField):
+            pks = {
+                item[name]
+                for item in items
+                if isinstance(item, dict) and isinstance(item.get(name), int) and not isinstance(item[name], bool)
+            }
+            prefetched[field.queryset.model] = field.queryset.in_bulk(pks) if pks else {}
+    return prefetched
+
+
+def title_clashes(model, objs):
+    """pks of ``objs`` whose new title or release year is that of another
+    row: one outside the batch or left unchanged by it, or one an earlier
+    item of the batch moved there."""
+    title_field = "name" if model is Series else "movie_name"
+    moved = {obj.pk: obj for obj in objs if obj.has_changed(title_field) or obj.has_changed("release_year")}
+    keys = {}
+    clashes = set()
+    for obj in moved.values():
+        if obj.release_year is None:
+            continue  # NULLs never clash in a unique constraint
+        key = (obj.normalized_name, obj.release_year)
+        if key in keys:
+            clashes.add(obj.pk)
+        else:
+            keys[key] = obj.pk
+
+    taken = (
+        model.objects.using(DEFAULT_DB_ALIAS)
+        .filter(normalized_name__in={name for name, _ in keys})
+        .exclude(pk__in=list(moved))
+        .values_list("normalized_name", "release_year")
+    )
+    return clashes | {keys[key] for key in taken if key in keys}
+
+
+def apply_updates(model, updated, changed_fields, genre_updates):
+    updated = list({obj.pk: obj for obj in updated}.values())
+    pks = [obj.pk for obj in updated]
+    genre_updates = {pk: genres for pk, genres in genre_updates.items() if pk in pks}
+    with transaction.atomic():
+        model.objects.bulk_update(updated, sorted(changed_fields), batch_size=100)
+        if genre_updates:
+            replace_genres(model, genre_updates)
+
+        # bulk_update sends no signals, so log the changes here
+        kind = model._meta.model_name
+        ChangeLog.record(kind, pks)
+        readmodel.refresh(kind, pks)
+        if model is Series and "name" in changed_fields:
+            movie_pks = list(Movie.objects.filter(series__in=pks).values_list("pk", flat=True))
+            ChangeLog.record("movie", movie_pks)
+            readmodel.refresh("movie", movie_pks)
+        if genre_updates or "release_year" in changed_fields:
+            transaction.on_commit(lambda: similarity.objects_changed(kind))
+
+
+def replace_genres(model, genre_updates):
+    """Replace the genres of many objects with batched through-table writes.
+    ``genre_updates`` maps object pk -> list of genre names."""
+    names = {name for genres in genre_updates.values() for name in genres if name}
+    Genre.objects.bulk_create([Genre(name=name) for name in names], ignore_conflicts=True)
+    genre_ids = dict(Genre.objects.filter(name__in=names).values_list("name", "id"))
+
+    through = model.genre.through
+    owner = f"{model._meta.model_name}_id"
+    through.objects.filter(**{f"{owner}__in": list(genre_updates)}).delete()
+    through.objects.bulk_create(
+        [
+            through(**{owner: pk, "genre_id": genre_ids[name]})
+            for pk, genres in genre_updates.items()
+            for name in dict.fromkeys(genres)
+            if name
+        ]
+    )
@@ -0,0 +1,19 @@
+from django.contrib.staticfiles import finders
+from django.core.checks import Tags, Warning, register
+
+# Produced by `manage.py build_assets`, referenced by every UI template
+BUILT_ASSETS = ["css/app.css", "fonts/plus-jakarta-sans-latin.woff2"]
+
+
+@register(Tags.staticfiles)
+def built_assets_check(app_configs, **kwargs):
+    missing = [name for name in BUILT_ASSETS if not finders.find(name)]
+    if not missing:
+        return []
+    return [
+        Warning(
+            f"UI assets have not been built: {', '.join(missing)}",
+            hint="Run `python manage.py build_assets` before collectstatic.",
+            id="project.W001",
+        )
+    ]
@@ -0,0 +1,83 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+# Clients retrying a timed-out create send the same Idempotency-Key header;
+# the first successful response is remembered as the ids it returned and
+# later requests with that key replay those objects without running the view.
+
+
+def fingerprint(data):
+    raw = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def replay(record, model, serializer_class):
+    objects = model.objects.in_bulk(record.object_ids)
+    found = [objects[pk] for pk in record.object_ids if pk in objects]
+    if record.many:
+        data = serializer_class(found, many=True).data
+    elif found:
+        data = serializer_class(found[0]).data
+    else:
+        return Response({"error": "The object created with this key was deleted"}, status=status.HTTP_410_GONE)
+    return Response(data, headers={"Idempotent-Replayed": "true"})
+
+
+def remember(kind, key, request_fingerprint, data):
+    many = isinstance(data, list)
+    object_ids = [item["id"] for item in (data if many else [data]) if isinstance(item, dict) and "id" in item]
+    now = timezone.now()
+    IdempotencyKey.objects.filter(created_at__lt=now - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)).delete()
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(
+                kind=kind, key=key, fingerprint=request_fingerprint, object_ids=object_ids, many=many
+            )
+    except IntegrityError:
+        # a concurrent request with the same key finished first; the unique
+        # title + year constraint made both resolve to the same objects
+        pass
+
+
+def idempotent(model, serializer_class):
+    """Replay the stored result of POST requests repeating an Idempotency-Key."""
+    kind = model._meta.model_name
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get("Idempotency-Key")
+            if not key:
+                return view_method(self, request, *args, **kwargs)
+            if len(key) > 255:
+                return Response({"error": "Idempotency-Key is too long"}, status=status.HTTP_400_BAD_REQUEST)
+
+            request_fingerprint = fingerprint(request.data)
+            cutoff = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+            record = IdempotencyKey.objects.filter(kind=kind, key=key, created_at__gte=cutoff).first()
+            if record is not None:
+                if record.fingerprint != request_fingerprint:
+                    return Response(
+                        {"error": "Idempotency-Key was already used with a different request body"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                return replay(record, model, serializer_class)
+
+            response = view_method(self, request, *args, **kwargs)
+            if status.is_success(response.status_code):
+                remember(kind, key, request_fingerprint, response.data)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+
+class Command(BaseCommand):
+    help = "Measure payload size, query count and timings of API reads"
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", default=["/anime_series/", "/movie/"])
+        parser.add_argument(
+            "--query",
+            action="append",
+            dest="queries",
+            help="Query string variant to compare, e.g. fields=poster (repeatable)",
+        )
+        parser.add_argument("--accept", default="application/json", help="Accept header to send")
+        parser.add_argument("--encoding", default="", help="Accept-Encoding header to send, e.g. br or gzip")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        client = Client(
+            HTTP_HOST="localhost",
+            HTTP_ACCEPT=options["accept"],
+            HTTP_ACCEPT_ENCODING=options["encoding"],
+        )
+        variants = options["queries"] or ["", "fields=poster"]
+
+        self.stdout.write(
+            f"{'request':<50} {'status':>6} {'bytes':>9} {'queries':>7} "
+            f"{'sql ms':>8} {'p50 ms':>8} {'p95 ms':>8}"
+        )
+        for path in options["paths"]:
+            for query in variants:
+                url = f"{path}?{query}" if query else path
+                self.stdout.write(self.measure(client, url, options["repeat"]))
+
+    def measure(self, client, url, repeat):
+        timings = []
+        sql_timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            sql_timings.append(sum(float(q["time"]) for q in ctx.captured_queries) * 1000)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        return (
+            f"{url:<50} {response.status_code:>6} {len(response.content):>9} "
+            f"{len(ctx.captured_queries):>7} {statistics.mean(sql_timings):>8.2f} "
+            f"{statistics.median(timings):>8.2f} {p95:>8.2f}"
+        )
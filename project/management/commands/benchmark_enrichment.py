@@ -0,0 +1,80 @@
+import statistics
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from project.utils import populate_movie_data, populate_series_data
+
+# the field of a populate_*_data result each provider fills
+PROVIDER_FIELDS = [("jikan", "about"), ("tmdb", "tmdb"), ("omdb", "imdb_link")]
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the enrichment path for many titles concurrently and report throughput and tail latency. "
+        "Meant to run against `manage.py simulate_providers`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=["series", "movie"], default="series")
+        parser.add_argument("--count", type=int, default=200, help="Number of enrichments to run")
+        parser.add_argument(
+            "--titles",
+            type=int,
+            help="Distinct titles among them (default: all distinct); fewer titles exercise single-flight",
+        )
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--allow-remote", action="store_true", help="Allow provider URLs that are not local")
+
+    def handle(self, *args, **options):
+        urls = [settings.JIKAN_BASE_URL, settings.TMDB_BASE_URL, settings.OMDB_BASE_URL]
+        remote = [url for url in urls if urlsplit(url).hostname not in ("localhost", "127.0.0.1", "::1")]
+        if remote and not options["allow_remote"]:
+            raise CommandError(f"Provider URLs are not local ({', '.join(remote)}); pass --allow-remote to use them")
+
+        populate = populate_series_data if options["kind"] == "series" else populate_movie_data
+        run = uuid.uuid4().hex[:8]
+        distinct = options["titles"] or options["count"]
+        titles = [f"Bench {run} {i % distinct}" for i in range(options["count"])]
+
+        def enrich(title):
+            # populate_*_data always returns a dict, with a provider's fields
+            # left empty when its call failed
+            start = time.perf_counter()
+            try:
+                result = populate(title)
+                missing = [provider for provider, field in PROVIDER_FIELDS if not result.get(field)]
+            except Exception as e:
+                print("Benchmark error:", e)
+                missing = [provider for provider, _ in PROVIDER_FIELDS]
+            finally:
+                connection.close()
+            return time.perf_counter() - start, missing
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(enrich, titles))
+        elapsed = time.perf_counter() - start
+
+        timings = sorted(duration for duration, _ in results)
+        failures = sum(1 for _, missing in results if missing)
+        by_provider = Counter(provider for _, missing in results for provider in missing)
+        detail = ", ".join(f"{provider} {by_provider[provider]}" for provider, _ in PROVIDER_FIELDS)
+
+        def percentile(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p))] * 1000
+
+        self.stdout.write(
+            f"{options['kind']} x{len(titles)} ({distinct} distinct) concurrency {options['concurrency']}: "
+            f"{len(titles) / elapsed:.1f}/s over {elapsed:.2f}s, {failures} failed (missing {detail})"
+        )
+        self.stdout.write(
+            f"p50 {statistics.median(timings) * 1000:.1f} ms  p95 {percentile(0.95):.1f} ms  "
+            f"p99 {percentile(0.99):.1f} ms  max {timings[-1] * 1000:.1f} ms"
+        )
@@ -0,0 +1,87 @@
+import re
+import shlex
+import subprocess
+import tempfile
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ASSETS_DIR = Path(settings.BASE_DIR) / "assets"
+TAILWIND_CONFIG = Path(settings.BASE_DIR) / "tailwind.config.js"
+FONT_FILE = "plus-jakarta-sans-{subset}.woff2"
+# Google Fonts only serves woff2 to browsers it recognises
+FONT_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+)
+FONT_FACE = re.compile(r"/\*\s*([\w-]+)\s*\*/\s*(@font-face\s*\{[^}]*\})")
+FONT_URL = re.compile(r"url\((https://[^)]+\.woff2)\)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the UI bundle: purged, minified Tailwind CSS plus self-hosted fonts, written to "
+        "STATICFILES_DIRS. Run before collectstatic."
+    )
+
+    def handle(self, *args, **options):
+        static_dir = Path(settings.STATICFILES_DIRS[0])
+        (static_dir / "css").mkdir(parents=True, exist_ok=True)
+        (static_dir / "fonts").mkdir(parents=True, exist_ok=True)
+
+        font_css = self.download_fonts(static_dir / "fonts")
+        tailwind_css = self.compile_tailwind()
+
+        bundle = static_dir / "css" / "app.css"
+        bundle.write_text(font_css + tailwind_css, encoding="utf-8")
+        self.stdout.write(f"{bundle}: {bundle.stat().st_size / 1024:.1f} KiB")
+        self.stdout.write("Now run `python manage.py collectstatic` to hash and precompress the assets.")
+
+    def download_fonts(self, fonts_dir):
+        try:
+            resp = requests.get(settings.UI_FONT_CSS_URL, headers={"User-Agent": FONT_USER_AGENT}, timeout=30)
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            raise CommandError(f"Could not fetch the font stylesheet: {e}")
+
+        offered = dict(FONT_FACE.findall(resp.text))
+        missing = [subset for subset in settings.UI_FONT_SUBSETS if subset not in offered]
+        if missing:
+            raise CommandError(f"Font subsets not offered: {', '.join(missing)}")
+
+        faces = []
+        for subset in settings.UI_FONT_SUBSETS:
+            face = offered[subset]
+            match = FONT_URL.search(face)
+            if not match:
+                raise CommandError(f"No woff2 source in the {subset} font face")
+            name = FONT_FILE.format(subset=subset)
+            try:
+                font = requests.get(match.group(1), timeout=30)
+                font.raise_for_status()
+            except requests.RequestException as e:
+                raise CommandError(f"Could not download the {subset} font: {e}")
+            (fonts_dir / name).write_bytes(font.content)
+            self.stdout.write(f"{fonts_dir / name}: {len(font.content) / 1024:.1f} KiB")
+            # relative, so the manifest storage rewrites it to the hashed name
+            faces.append(" ".join(face.replace(match.group(1), f"../fonts/{name}").split()))
+
+        return "".join(faces)
+
+    def compile_tailwind(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "tailwind.css"
+            command = shlex.split(settings.TAILWIND_CLI) + [
+                "-c", str(TAILWIND_CONFIG),
+                "-i", str(ASSETS_DIR / "app.css"),
+                "-o", str(output),
+                "--minify",
+            ]
+            try:
+                subprocess.run(command, cwd=settings.BASE_DIR, check=True)
+            except FileNotFoundError:
+                raise CommandError(f"Tailwind CLI not found: {settings.TAILWIND_CLI} (set TAILWIND_CLI)")
+            except subprocess.CalledProcessError as e:
+                raise CommandError(f"Tailwind build failed with exit code {e.returncode}")
+            return output.read_text(encoding="utf-8")
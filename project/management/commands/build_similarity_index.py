@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from project.similarity import MODELS, get_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the persisted similarity index used by /similar/ and the detail pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kinds", nargs="*", default=list(MODELS), help="series and/or movie")
+
+    def handle(self, *args, **options):
+        unknown = set(options["kinds"]) - set(MODELS)
+        if unknown:
+            raise CommandError(f"Unknown kind(s): {', '.join(sorted(unknown))}")
+
+        for kind in options["kinds"]:
+            start = time.perf_counter()
+            index = get_index(kind)
+            index.build()
+            self.stdout.write(
+                f"{kind}: {len(index.ids)} rows, {len(index.genre_ids)} genres "
+                f"in {time.perf_counter() - start:.2f}s -> {index.path}"
+            )
@@ -0,0 +1,80 @@
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+
+from project.models import Series
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent readers and writers against the configured database and report "
+        "throughput, latency and lock errors. Compare profiles with e.g. SQLITE_TUNED=False."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--write-ratio", type=float, default=0.3)
+
+    def handle(self, *args, **options):
+        ids = list(Series.objects.values_list("id", flat=True)[:500])
+        if not ids:
+            self.stderr.write("No series rows to work on; create some first.")
+            return
+
+        db = settings.DATABASES["default"]
+        self.stdout.write(f"profile={settings.DB_PROFILE} engine={db['ENGINE']} options={db.get('OPTIONS', {})}")
+
+        stats = {"reads": [], "writes": [], "errors": 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options["seconds"]
+
+        def worker():
+            rng = random.Random()
+            local = {"reads": [], "writes": [], "errors": 0}
+            try:
+                while time.monotonic() < deadline:
+                    write = rng.random() < options["write_ratio"]
+                    start = time.perf_counter()
+                    try:
+                        if write:
+                            with transaction.atomic():
+                                pk = rng.choice(ids)
+                                Series.objects.filter(pk=pk).values_list("release_year", flat=True).first()
+                                Series.objects.filter(pk=pk).update(release_year=F("release_year") + 0)
+                        else:
+                            list(Series.objects.order_by("-release_year").values("id", "name")[:20])
+                    except OperationalError:
+                        local["errors"] += 1
+                        continue
+                    local["writes" if write else "reads"].append(time.perf_counter() - start)
+            finally:
+                connection.close()
+            with lock:
+                stats["reads"] += local["reads"]
+                stats["writes"] += local["writes"]
+                stats["errors"] += local["errors"]
+
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for kind in ("reads", "writes"):
+            timings = sorted(stats[kind])
+            if not timings:
+                self.stdout.write(f"{kind:<7} none completed")
+                continue
+            p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            self.stdout.write(
+                f"{kind:<7} {len(timings) / options['seconds']:>9.1f}/s "
+                f"p50 {statistics.median(timings) * 1000:>7.2f} ms  p99 {p99 * 1000:>8.2f} ms"
+            )
+        self.stdout.write(f"lock errors {stats['errors']}")
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from project.readmodel import READ_MODELS, refresh
+
+
+class Command(BaseCommand):
+    help = "Re-render the stored API representation (the rendered column) of every series and movie"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kinds", nargs="*", default=list(READ_MODELS), help="series and/or movie")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        unknown = set(options["kinds"]) - set(READ_MODELS)
+        if unknown:
+            raise CommandError(f"Unknown kind(s): {', '.join(sorted(unknown))}")
+
+        for kind in options["kinds"]:
+            start = time.perf_counter()
+            model = READ_MODELS[kind][0]
+            pks = list(model.objects.order_by("pk").values_list("pk", flat=True))
+            refresh(kind, pks, batch_size=options["batch_size"])
+            self.stdout.write(f"{kind}: rendered {len(pks)} rows in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from project.simulator import DEFAULT_FIXTURES, PROVIDERS, ProviderSimulator, load_fixtures, make_server, parse_latency
+
+
+class Command(BaseCommand):
+    help = "Serve recorded Jikan/TMDB/OMDb responses locally with injected latency, errors and 429 bursts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--fixtures", default=str(DEFAULT_FIXTURES), help="JSON file of recorded responses")
+        parser.add_argument(
+            "--latency",
+            action="append",
+            default=[],
+            help='Latency distribution, optionally per provider: "lognormal:120,0.6", '
+            '"jikan=uniform:200,900", "fixed:0" (repeatable)',
+        )
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+        parser.add_argument("--burst-every", type=int, default=0, help="Start a run of 429s every N requests per provider")
+        parser.add_argument("--burst-length", type=int, default=0, help="Length of each 429 run")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--no-synthesize",
+            action="store_true",
+            help="Answer titles missing from the fixtures with empty results instead of generated ones",
+        )
+        parser.add_argument("--log-requests", action="store_true")
+
+    def handle(self, *args, **options):
+        latency = {provider: parse_latency("fixed:0") for provider in PROVIDERS}
+        try:
+            for spec in options["latency"]:
+                provider, sep, distribution = spec.rpartition("=")
+                if sep and provider not in PROVIDERS:
+                    raise CommandError(f"Unknown provider in --latency: {provider}")
+                for name in [provider] if sep else PROVIDERS:
+                    latency[name] = parse_latency(distribution)
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options["burst_length"] > options["burst_every"]:
+            raise CommandError("--burst-length cannot exceed --burst-every")
+
+        simulator = ProviderSimulator(
+            load_fixtures(options["fixtures"]),
+            latency,
+            error_rate=options["error_rate"],
+            burst_every=options["burst_every"],
+            burst_length=options["burst_length"],
+            seed=options["seed"],
+            synthesize=not options["no_synthesize"],
+        )
+        server = make_server(simulator, options["host"], options["port"], log=options["log_requests"])
+        base = f"http://{options['host']}:{server.server_port}"
+        self.stdout.write("Provider simulator running; point the app at it with:")
+        self.stdout.write(f"  JIKAN_BASE_URL={base}/jikan")
+        self.stdout.write(f"  TMDB_BASE_URL={base}/tmdb")
+        self.stdout.write(f"  OMDB_BASE_URL={base}/omdb/")
+        self.stdout.write(f"Counters: {base}/_stats")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            for provider, counts in simulator.stats().items():
+                self.stdout.write(f"{provider:<6} {counts['requests']:>7} requests  {counts['responses']}")
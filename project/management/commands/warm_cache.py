@@ -0,0 +1,39 @@
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from project.warmup import paths_from_config, paths_from_log, warm
+
+
+class Command(BaseCommand):
+    help = "Replay the most requested list/filter/page URLs to warm a freshly started deployment"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", help="Access log to pick the most requested paths from")
+        parser.add_argument("--config", help='JSON file with a list of paths or {"paths": [...]}')
+        parser.add_argument("--top", type=int, default=settings.CACHE_WARM_TOP)
+        parser.add_argument("--workers", type=int, default=settings.CACHE_WARM_WORKERS)
+        parser.add_argument("--base-url", help="Warm a running server over HTTP instead of in-process")
+
+    def handle(self, *args, **options):
+        if options["log"]:
+            paths = paths_from_log(options["log"], options["top"])
+        elif options["config"]:
+            paths = paths_from_config(options["config"], options["top"])
+        else:
+            paths = settings.CACHE_WARM_PATHS[: options["top"]]
+
+        if not paths:
+            self.stdout.write("Nothing to warm.")
+            return
+
+        results = warm(paths, workers=options["workers"], base_url=options["base_url"])
+        for path, status_code, elapsed in results:
+            self.stdout.write(f"{status_code or 'ERR':>4} {elapsed:>8.1f} ms  {path}")
+
+        timings = [elapsed for _, _, elapsed in results]
+        failed = sum(1 for _, status_code, _ in results if not status_code or status_code >= 500)
+        self.stdout.write(
+            f"Warmed {len(results)} paths ({failed} failed), median {statistics.median(timings):.1f} ms"
+        )
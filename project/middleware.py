@@ -0,0 +1,134 @@
+import gzip
+import math
+import time
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence
+
+from .profiling import requested_mode, run_profiled
+from .routers import next_replica, pin_primary, read_from
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q=") and not params[2:].strip("0."):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    # Like django's GZipMiddleware, plus brotli and a size threshold so
+    # small responses are not compressed for nothing. Limited to the
+    # COMPRESSION_CONTENT_TYPES, which carry no CSRF tokens.
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type not in settings.COMPRESSION_CONTENT_TYPES:
+            return response
+
+        accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+
+        if response.streaming:
+            if "gzip" not in accepted:
+                return response
+            patch_vary_headers(response, ("Accept-Encoding",))
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response.headers["Content-Length"]
+            response.headers["Content-Encoding"] = "gzip"
+            return response
+
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if brotli is not None and "br" in accepted:
+            encoding = "br"
+            compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        elif "gzip" in accepted:
+            encoding = "gzip"
+            compressed = gzip.compress(response.content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+        else:
+            return response
+
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(response.content))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    # Safe requests read from one replica for their whole duration, unless the
+    # client wrote recently: its own writes pin it to the primary for
+    # REPLICA_STICKINESS_SECONDS so it never reads a lagging copy of them.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        if request.method not in SAFE_METHODS or self.is_pinned(request):
+            routing = pin_primary()
+        else:
+            routing = read_from(next_replica())
+        with routing:
+            response = self.get_response(request)
+
+        if request.method not in SAFE_METHODS:
+            stickiness = settings.REPLICA_STICKINESS_SECONDS
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                str(time.time() + stickiness),
+                max_age=math.ceil(stickiness),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def is_pinned(self, request):
+        try:
+            return float(request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+
+class ProfilingMiddleware:
+    # Staff can ask for any request to be profiled (see project.profiling);
+    # the saved profile is linked from the X-Profile-Id response header.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        if not settings.PROFILING_ENABLED or mode is None or not request.user.is_staff:
+            return self.get_response(request)
+
+        response, profile_id = run_profiled(request, mode, self.get_response)
+        if profile_id is None:
+            response.headers["X-Profile-Skipped"] = "another request is being profiled"
+        else:
+            response.headers["X-Profile-Id"] = profile_id
+        return response
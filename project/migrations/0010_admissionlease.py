@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("project", "0009_changelog"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AdmissionLease",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("slot", models.PositiveIntegerField(unique=True)),
+                (
+                    "acquired_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("project", "0010_admissionlease"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="movie",
+            name="movie_name",
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name="series",
+            name="name",
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
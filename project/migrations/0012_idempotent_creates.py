@@ -0,0 +1,83 @@
+from django.db import migrations, models
+
+
+def fill_normalized_names(apps, schema_editor):
+    # Existing duplicates of the same title + year keep their rows; all but
+    # the oldest get a "#<pk>" suffix so the unique constraint can be added.
+    db_alias = schema_editor.connection.alias
+    for model_name, title_field in (("Series", "name"), ("Movie", "movie_name")):
+        model = apps.get_model("project", model_name)
+        seen = set()
+        objs = list(model.objects.using(db_alias).order_by("pk"))
+        for obj in objs:
+            normalized = " ".join(str(getattr(obj, title_field)).split()).casefold()[:255]
+            if (normalized, obj.release_year) in seen:
+                suffix = f"#{obj.pk}"
+                normalized = normalized[: 255 - len(suffix)] + suffix
+            seen.add((normalized, obj.release_year))
+            obj.normalized_name = normalized
+        model.objects.using(db_alias).bulk_update(objs, ["normalized_name"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("project", "0011_name_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="series",
+            name="normalized_name",
+            field=models.CharField(default="", editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="movie",
+            name="normalized_name",
+            field=models.CharField(default="", editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_normalized_names, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="series",
+            constraint=models.UniqueConstraint(
+                fields=("normalized_name", "release_year"),
+                name="unique_series_title_year",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="movie",
+            constraint=models.UniqueConstraint(
+                fields=("normalized_name", "release_year"),
+                name="unique_movie_title_year",
+            ),
+        ),
+        migrations.CreateModel(
+            name="IdempotencyKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=20)),
+                ("key", models.CharField(max_length=255)),
+                ("fingerprint", models.CharField(max_length=64)),
+                ("object_ids", models.JSONField()),
+                ("many", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "key"), name="unique_idempotency_key"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("project", "0012_idempotent_creates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movie",
+            name="rendered",
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="series",
+            name="rendered",
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -2,14 +2,38 @@ from django.db import models
 from django.utils import timezone
 
 
+def normalize_title(title):
+    # casefolding can lengthen a title ("ß" -> "ss"); cut to fit normalized_name
+    return " ".join(str(title).split()).casefold()[:255]
+
+
 class BaseModel(models.Model):
     created_at = models.DateField(auto_now_add=True)
     updated_at = models.DateField(auto_now=True)
     deleted_at = models.DateField(null=True, blank=True)
 
+    # fields whose loaded values are kept, so has_changed() can tell what a save changes
+    tracked_fields = ()
+
     class Meta:
         abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded = {name: instance.__dict__[name] for name in cls.tracked_fields if name in instance.__dict__}
+        return instance
+
+    def has_changed(self, name):
+        """True for a new object or a tracked field set to a new value (a
+        field deferred when loading counts as changed)."""
+        loaded = getattr(self, "_loaded", None)
+        return loaded is None or name not in loaded or getattr(self, name) != loaded[name]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded = {name: self.__dict__[name] for name in self.tracked_fields if name in self.__dict__}
+
     def soft_delete(self):
         self.deleted_at = timezone.now()
         self.save(update_fields=["deleted_at"])
@@ -23,7 +47,9 @@ class Genre(models.Model):
 
 
 class Series(BaseModel):
-    name = models.CharField(max_length=255)
+    # indexed for the exact-title lookup of populate_series_data
+    name = models.CharField(max_length=255, db_index=True)
+    normalized_name = models.CharField(max_length=255, editable=False)
     about = models.TextField()
     genre = models.ManyToManyField(Genre)
     release_year = models.IntegerField(null=True, blank=True)
@@ -37,12 +63,31 @@ class Series(BaseModel):
     crunchyroll = models.URLField(null=True, blank=True)
     tmdb = models.URLField(null=True, blank=True)
 
+    # full API representation, maintained by project.readmodel
+    rendered = models.JSONField(null=True, blank=True, editable=False)
+
+    tracked_fields = ("name", "release_year")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["normalized_name", "release_year"], name="unique_series_title_year"),
+        ]
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # only a new or renamed title is renormalized, so the "#<pk>" suffix
+        # migration 0012 gave legacy duplicates survives unrelated saves
+        if self.has_changed("name"):
+            self.normalized_name = normalize_title(self.name)
+        super().save(*args, **kwargs)
+
 
 class Movie(BaseModel):
-    movie_name = models.CharField(max_length=255)
+    # indexed for the exact-title lookup of populate_movie_data
+    movie_name = models.CharField(max_length=255, db_index=True)
+    normalized_name = models.CharField(max_length=255, editable=False)
     about = models.TextField(blank=True)
 
     series = models.ForeignKey(
@@ -65,5 +110,80 @@ class Movie(BaseModel):
 
     # Streaming (ONLY THESE 3)
     crunchyroll = models.URLField(null=True, blank=True)
+
+    # full API representation, maintained by project.readmodel
+    rendered = models.JSONField(null=True, blank=True, editable=False)
+
+    tracked_fields = ("movie_name", "release_year")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["normalized_name", "release_year"], name="unique_movie_title_year"),
+        ]
+
     def __str__(self):
         return self.movie_name
+
+    def save(self, *args, **kwargs):
+        # only a new or renamed title is renormalized, so the "#<pk>" suffix
+        # migration 0012 gave legacy duplicates survives unrelated saves
+        if self.has_changed("movie_name"):
+            self.normalized_name = normalize_title(self.movie_name)
+        super().save(*args, **kwargs)
+
+
+class EnrichmentFetch(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    result = models.JSONField(null=True, blank=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.key
+
+
+class ChangeLog(models.Model):
+    UPSERT = "upsert"
+    DELETE = "delete"
+    ACTION_CHOICES = [(UPSERT, "Upsert"), (DELETE, "Delete")]
+
+    seq = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["seq"]
+
+    def __str__(self):
+        return f"{self.seq} {self.action} {self.kind}:{self.object_id}"
+
+    @classmethod
+    def record(cls, kind, ids, action=UPSERT):
+        cls.objects.bulk_create([cls(kind=kind, object_id=pk, action=action) for pk in ids])
+
+
+class AdmissionLease(models.Model):
+    slot = models.PositiveIntegerField(unique=True)
+    acquired_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"slot {self.slot}"
+
+
+class IdempotencyKey(models.Model):
+    kind = models.CharField(max_length=20)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    object_ids = models.JSONField()
+    many = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "key"], name="unique_idempotency_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.key}"
@@ -0,0 +1,235 @@
+import cProfile
+import json
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+# A staff request sent with "X-Profile: 1" (or ?_profile=1) runs under
+# cProfile; "sample" instead samples its stack every PROFILE_SAMPLE_INTERVAL
+# and writes a speedscope file. Either way the SQL statements and provider
+# calls it made are saved next to the artifact under PROFILE_DIR.
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_PARAM = "_profile"
+MODES = {"1": "cprofile", "cprofile": "cprofile", "sample": "sample"}
+SECRET_PARAMS = {"apikey", "api_key"}
+ARTIFACTS = {"cprofile": "pstats", "sample": "speedscope.json"}
+
+_active = ContextVar("active_profile", default=None)
+# cProfile cannot run two profilers in one process at the same time
+_cprofile_lock = threading.Lock()
+
+
+class Profile:
+    def __init__(self, request, mode):
+        self.id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.mode = mode
+        self.method = request.method
+        self.path = request.get_full_path()
+        self.user = request.user.get_username()
+        self.sql = []
+        self.provider_calls = []
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql.append(
+                {
+                    "alias": context["connection"].alias,
+                    "sql": sql,
+                    "many": many,
+                    "ms": round((time.perf_counter() - start) * 1000, 3),
+                }
+            )
+
+
+def requested_mode(request):
+    value = request.META.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+    return MODES.get(value) if value else None
+
+
+def record_provider_call(provider, url, params, status_code, seconds):
+    profile = _active.get()
+    if profile is None:
+        return
+    profile.provider_calls.append(
+        {
+            "provider": provider,
+            "url": url,
+            "params": {key: ("***" if key in SECRET_PARAMS else value) for key, value in (params or {}).items()},
+            "status": status_code,
+            "ms": round(seconds * 1000, 3),
+        }
+    )
+
+
+def run_profiled(request, mode, get_response):
+    """Run the request under the profiler. Returns (response, profile id),
+    with no id when another request holds the cProfile profiler."""
+    if mode == "cprofile" and not _cprofile_lock.acquire(blocking=False):
+        return get_response(request), None
+
+    profile = Profile(request, mode)
+    token = _active.set(profile)
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(profile.sql_wrapper))
+            if mode == "cprofile":
+                profiler = cProfile.Profile()
+                response = profiler.runcall(get_response, request)
+            else:
+                sampler = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL)
+                with sampler:
+                    response = get_response(request)
+    finally:
+        _active.reset(token)
+        if mode == "cprofile":
+            _cprofile_lock.release()
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "id": profile.id,
+        "mode": mode,
+        "method": profile.method,
+        "path": profile.path,
+        "user": profile.user,
+        "status": response.status_code,
+        "ms": round(elapsed * 1000, 3),
+        "sql_count": len(profile.sql),
+        "sql_ms": round(sum(q["ms"] for q in profile.sql), 3),
+        "sql": profile.sql,
+        "provider_calls": profile.provider_calls,
+    }
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    artifact = directory / f"{profile.id}.{ARTIFACTS[mode]}"
+    if mode == "cprofile":
+        profiler.dump_stats(artifact)
+        report["top"] = top_functions(pstats.Stats(profiler))
+    else:
+        artifact.write_text(json.dumps(sampler.speedscope(profile.path)))
+    (directory / f"{profile.id}.json").write_text(json.dumps(report, default=str))
+    prune(directory)
+    return response, profile.id
+
+
+def top_functions(stats, limit=30):
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:limit]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows
+    ]
+
+
+class StackSampler:
+    """Samples the stack of one thread from a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames = {}
+        self.samples = []
+        self.weights = []
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_name, code.co_filename, code.co_firstlineno)
+                stack.append(self.frames.setdefault(key, len(self.frames)))
+                frame = frame.f_back
+            self.samples.append(stack[::-1])
+            self.weights.append(round((now - last) * 1000, 3))
+            last = now
+
+    def speedscope(self, name):
+        frames = sorted(self.frames, key=self.frames.get)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": n, "file": f, "line": line} for n, f, line in frames]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": round(sum(self.weights), 3),
+                    "samples": self.samples,
+                    "weights": self.weights,
+                }
+            ],
+        }
+
+
+def prune(directory):
+    reports = sorted(directory.glob("*.json"), key=lambda p: p.name)
+    reports = [p for p in reports if not p.name.endswith(".speedscope.json")]
+    for report in reports[: -settings.PROFILE_KEEP]:
+        profile_id = report.name[: -len(".json")]
+        for path in directory.glob(f"{profile_id}.*"):
+            path.unlink(missing_ok=True)
+
+
+# -------- reading saved profiles -------- #
+
+PROFILE_ID = re.compile(r"^\d{14}-[0-9a-f]{8}$")
+
+
+def list_profiles():
+    directory = Path(settings.PROFILE_DIR)
+    summaries = []
+    for path in sorted(directory.glob("*.json"), key=lambda p: p.name, reverse=True):
+        if path.name.endswith(".speedscope.json"):
+            continue
+        report = json.loads(path.read_text())
+        summaries.append({key: report[key] for key in ("id", "mode", "method", "path", "status", "ms", "sql_count")})
+    return summaries
+
+
+def load_report(profile_id):
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = Path(settings.PROFILE_DIR) / f"{profile_id}.json"
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def artifact_path(profile_id):
+    report = load_report(profile_id)
+    if report is None:
+        return None
+    path = Path(settings.PROFILE_DIR) / f"{profile_id}.{ARTIFACTS[report['mode']]}"
+    return path if path.exists() else None
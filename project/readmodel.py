@@ -0,0 +1,90 @@
+from django.apps import apps as global_apps
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Prefetch, prefetch_related_objects
+
+from .models import Movie, Series
+from .serializers import MovieSerializer, SeriesSerializer
+
+# Series.rendered / Movie.rendered hold the full API representation of the
+# row, so list and detail reads are a primary-key fetch of one column. The
+# signals and the bulk write path call refresh() whenever a representation
+# changes; `manage.py rebuild_read_model` recomputes all of them, and every
+# migrate renders the rows still without one (see backfill()).
+
+READ_MODELS = {"series": (Series, SeriesSerializer), "movie": (Movie, MovieSerializer)}
+
+
+def refresh(kind, pks, batch_size=500, using=DEFAULT_DB_ALIAS):
+    model, serializer_class = READ_MODELS[kind]
+    pks = list(pks)
+    for start in range(0, len(pks), batch_size):
+        queryset = model.objects.using(using).filter(pk__in=pks[start:start + batch_size])
+        objs = list(serializer_class.prefetch_queryset(queryset))
+        serializer = serializer_class()
+        for obj in objs:
+            obj.rendered = serializer.to_representation(obj)
+        # bulk_update sends no post_save, so this does not re-enter the signals
+        model.objects.using(using).bulk_update(objs, ["rendered"])
+
+
+def backfill(sender, using=DEFAULT_DB_ALIAS, apps=global_apps, verbosity=1, **kwargs):
+    """post_migrate: render the rows that have no stored representation yet,
+    such as every row that existed when migration 0013 added the column."""
+    for kind, (model, _) in READ_MODELS.items():
+        # the serializers need the current schema, not an earlier migrate target
+        columns = {field.column for field in apps.get_model(model._meta.label)._meta.concrete_fields}
+        if not {field.column for field in model._meta.concrete_fields} <= columns:
+            continue
+        pks = list(model.objects.using(using).filter(rendered__isnull=True).values_list("pk", flat=True))
+        if pks:
+            refresh(kind, pks, using=using)
+            if verbosity >= 1:
+                print(f"  Rendered {len(pks)} {kind} rows without a stored representation.")
+
+
+def ordered_ids(queryset):
+    """The pks of ``queryset``, with pk as the last ordering term so rows
+    with equal sort keys keep their place between pages."""
+    return queryset.order_by(*queryset.query.order_by, "pk").values_list("pk", flat=True)
+
+
+def representations(model, serializer_class, pks, fields=None):
+    """Rendered representations of ``pks`` in the given order, limited to
+    ``fields``. Rows not rendered yet are serialized on the fly."""
+    rows = dict(model.objects.filter(pk__in=pks).values_list("pk", "rendered"))
+
+    missing = [pk for pk, rendered in rows.items() if rendered is None]
+    if missing:
+        serializer = serializer_class()
+        for obj in serializer_class.prefetch_queryset(model.objects.filter(pk__in=missing)):
+            rows[obj.pk] = serializer.to_representation(obj)
+
+    names = [name for name in serializer_class.representation if fields is None or name in fields]
+    return [{name: rows[pk].get(name) for name in names} for pk in pks if pk in rows]
+
+
+def embed_movies(rows, limit):
+    """Add to each rendered series in ``rows`` its first ``limit`` movies by
+    release year and its total movie count, in three queries whatever the
+    number of rows."""
+    parents = [Series(pk=row["id"]) for row in rows]
+    movies = Movie.objects.order_by("release_year", "pk").only("pk", "series_id")[:limit]
+    prefetch_related_objects(parents, Prefetch("movies", queryset=movies, to_attr="expanded_movies"))
+
+    ids = [movie.pk for parent in parents for movie in parent.expanded_movies]
+    rendered = {data["id"]: data for data in representations(Movie, MovieSerializer, ids)}
+    counts = dict(
+        Movie.objects.filter(series__in=[row["id"] for row in rows])
+        .order_by()
+        .values_list("series")
+        .annotate(count=Count("pk"))
+    )
+
+    for row, parent in zip(rows, parents):
+        row["movie_count"] = counts.get(row["id"], 0)
+        row["movies"] = [
+            {key: value for key, value in rendered[movie.pk].items() if key != "series"}
+            for movie in parent.expanded_movies
+            if movie.pk in rendered
+        ]
+    return rows
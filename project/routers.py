@@ -0,0 +1,62 @@
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Set per request by ReplicaRoutingMiddleware: either the replica every read
+# of the request goes to, or DEFAULT_DB_ALIAS when reads must see our writes.
+# Reads outside a request (migrations, management commands, on_commit hooks)
+# stay on the primary.
+_read_alias = ContextVar("read_alias", default=None)
+
+# Tables whose reads must never lag behind writes
+PRIMARY_ONLY_MODELS = {"enrichmentfetch", "admissionlease", "idempotencykey", "cacheentry"}
+
+_replica_cycle = None
+_replica_lock = threading.Lock()
+
+
+def next_replica():
+    global _replica_cycle
+    if not settings.DATABASE_REPLICAS:
+        return DEFAULT_DB_ALIAS
+    with _replica_lock:
+        if _replica_cycle is None:
+            _replica_cycle = itertools.cycle(settings.DATABASE_REPLICAS)
+        return next(_replica_cycle)
+
+
+@contextmanager
+def read_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def pin_primary():
+    return read_from(DEFAULT_DB_ALIAS)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or model._meta.model_name in PRIMARY_ONLY_MODELS:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
@@ -1,13 +1,92 @@
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
 from rest_framework import serializers
-from .models import Series, Genre, Movie
+from .models import Series, Genre, Movie, normalize_title
 from .utils import populate_series_data, populate_movie_data
 import textwrap
 
 
+def wrap_about(about):
+    if not about:
+        return None
+    clean_text = about.replace("\r", " ").replace("\n", " ").strip()
+    return textwrap.wrap(clean_text, width=100)
+
+
+def find_existing(model, title, release_year=None):
+    """The record a create of ``title`` would duplicate, read from the
+    primary. Without a year any release of the title counts."""
+    queryset = model.objects.using(DEFAULT_DB_ALIAS).filter(normalized_name=normalize_title(title))
+    if release_year:
+        queryset = queryset.filter(release_year=release_year)
+    return queryset.order_by("pk").first()
+
+
+def create_unique(model, title, validated_data):
+    """Create the record, or return the one a concurrent request created
+    for the same title + year first. Returns (obj, created)."""
+    try:
+        with transaction.atomic():
+            return model.objects.create(**validated_data), True
+    except IntegrityError:
+        existing = find_existing(model, title, validated_data["release_year"])
+        if existing is None:
+            raise
+        return existing, False
+
+
+DUPLICATE_TITLE_ERROR = "A record with this title and release year already exists"
+
+
+def save_unique(instance):
+    try:
+        with transaction.atomic():
+            instance.save()
+    except IntegrityError:
+        raise serializers.ValidationError({"error": DUPLICATE_TITLE_ERROR})
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Looks pks up in context["prefetched"][model] (filled by the bulk
+    endpoints for a whole batch) before querying for them one by one."""
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get("prefetched", {}).get(self.queryset.model, {})
+        if isinstance(data, int) and not isinstance(data, bool) and data in prefetched:
+            return prefetched[data]
+        return super().to_internal_value(data)
+
+
+class SparseFieldsMixin:
+    # output field -> getter, relation to join, relation to prefetch
+    representation = {}
+    representation_select = {}
+    representation_prefetch = {}
+
+    @classmethod
+    def parse_fields(cls, raw):
+        if not raw:
+            return None, None
+        fields = {name.strip() for name in raw.split(",") if name.strip()}
+        unknown = sorted(fields - set(cls.representation))
+        if unknown:
+            return None, {"fields": [f"Unknown field: {name}" for name in unknown]}
+        return fields | {"id"}, None
+
+    @classmethod
+    def prefetch_queryset(cls, queryset):
+        select = list(cls.representation_select.values())
+        if select:
+            queryset = queryset.select_related(*select)
+        return queryset.prefetch_related(*cls.representation_prefetch.values())
+
+    def to_representation(self, instance):
+        return {name: getter(instance) for name, getter in self.representation.items()}
+
+
 class GenreSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=100)
 
-class SeriesSerializer(serializers.Serializer):
+class SeriesSerializer(SparseFieldsMixin, serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
     name = serializers.CharField(max_length=255)
     about = serializers.CharField(required=False, allow_blank=True, allow_null=True)
@@ -21,28 +100,28 @@ class SeriesSerializer(serializers.Serializer):
     tmdb = serializers.URLField(required=False, allow_null=True, allow_blank=True)
     crunchyroll = serializers.URLField(required=False, allow_null=True, allow_blank=True)
 
-    def to_representation(self, instance):
-        data = {
-            "id": instance.id,
-            "name": instance.name,
-            "about": None,
-            "release_year": instance.release_year,
-            "poster": instance.poster,
-            "imdb_link": instance.imdb_link,
-            "rt_link": instance.rt_link,
-            "tmdb": instance.tmdb,
-            "crunchyroll": instance.crunchyroll,
-            "genre": [{"name": g.name} for g in instance.genre.all()],
-        }
-        if instance.about:
-            clean_text = instance.about.replace("\r", " ").replace("\n", " ").strip()
-            data["about"] = textwrap.wrap(clean_text, width=100)
-        return data
+    representation = {
+        "id": lambda obj: obj.id,
+        "name": lambda obj: obj.name,
+        "about": lambda obj: wrap_about(obj.about),
+        "release_year": lambda obj: obj.release_year,
+        "poster": lambda obj: obj.poster,
+        "imdb_link": lambda obj: obj.imdb_link,
+        "rt_link": lambda obj: obj.rt_link,
+        "tmdb": lambda obj: obj.tmdb,
+        "crunchyroll": lambda obj: obj.crunchyroll,
+        "genre": lambda obj: [{"name": g.name} for g in obj.genre.all()],
+    }
+    representation_prefetch = {"genre": "genre"}
 
     def create(self, validated_data):
         user_genres = validated_data.pop("genre", None)
         series_name = validated_data.get("name")
 
+        existing = find_existing(Series, series_name, validated_data.get("release_year"))
+        if existing is not None:
+            return existing
+
         fetched = populate_series_data(series_name)
 
         if fetched:
@@ -56,7 +135,9 @@ class SeriesSerializer(serializers.Serializer):
         if not validated_data.get("release_year"):
             validated_data["release_year"] = 0
 
-        series = Series.objects.create(**validated_data)
+        series, created = create_unique(Series, series_name, validated_data)
+        if not created:
+            return series
 
         all_genres = user_genres if user_genres is not None else fetched_genres
         genre_objs = []
@@ -70,7 +151,17 @@ class SeriesSerializer(serializers.Serializer):
             series.genre.set(genre_objs)
         return series
 
-class MovieSerializer(serializers.Serializer):
+    def update(self, instance, validated_data):
+        user_genres = validated_data.pop("genre", None)
+        for key, value in validated_data.items():
+            setattr(instance, key, value)
+        save_unique(instance)
+
+        if user_genres is not None:
+            instance.genre.set([Genre.objects.get_or_create(name=name)[0] for name in user_genres if name])
+        return instance
+
+class MovieSerializer(SparseFieldsMixin, serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
     movie_name = serializers.CharField(max_length=255)
     about = serializers.CharField(required=False, allow_blank=True, allow_null=True)
@@ -83,34 +174,35 @@ class MovieSerializer(serializers.Serializer):
     rt_link = serializers.URLField(required=False, allow_null=True, allow_blank=True)
     tmdb = serializers.URLField(required=False, allow_null=True, allow_blank=True)
     crunchyroll = serializers.URLField(required=False, allow_null=True, allow_blank=True)
-    series = serializers.PrimaryKeyRelatedField(
+    series = PrefetchedPrimaryKeyRelatedField(
         queryset=Series.objects.all(), required=False, allow_null=True
     )
 
-    def to_representation(self, instance):
-        data = {
-            "id": instance.id,
-            "movie_name": instance.movie_name,
-            "about": None,
-            "release_year": instance.release_year,
-            "poster": instance.poster,
-            "imdb_link": instance.imdb_link,
-            "rt_link": instance.rt_link,
-            "tmdb": instance.tmdb,
-            "crunchyroll": instance.crunchyroll,
-            "series": ({"name": instance.series.name} if instance.series else None),
-            "genre": [{"name": g.name} for g in instance.genre.all()],
-        }
-        if instance.about:
-            clean_text = instance.about.replace("\r", " ").replace("\n", " ").strip()
-            data["about"] = textwrap.wrap(clean_text, width=100)
-        return data
+    representation = {
+        "id": lambda obj: obj.id,
+        "movie_name": lambda obj: obj.movie_name,
+        "about": lambda obj: wrap_about(obj.about),
+        "release_year": lambda obj: obj.release_year,
+        "poster": lambda obj: obj.poster,
+        "imdb_link": lambda obj: obj.imdb_link,
+        "rt_link": lambda obj: obj.rt_link,
+        "tmdb": lambda obj: obj.tmdb,
+        "crunchyroll": lambda obj: obj.crunchyroll,
+        "series": lambda obj: {"name": obj.series.name} if obj.series else None,
+        "genre": lambda obj: [{"name": g.name} for g in obj.genre.all()],
+    }
+    representation_select = {"series": "series"}
+    representation_prefetch = {"genre": "genre"}
 
     def create(self, validated_data):
         user_genres = validated_data.pop("genre", None)
         series_obj = validated_data.pop("series", None)
         movie_name = validated_data.get("movie_name")
 
+        existing = find_existing(Movie, movie_name, validated_data.get("release_year"))
+        if existing is not None:
+            return existing
+
         fetched = populate_movie_data(movie_name)
         if fetched:
             fetched_genres = fetched.pop("genre", [])
@@ -123,7 +215,9 @@ class MovieSerializer(serializers.Serializer):
         if not validated_data.get("release_year"):
             validated_data["release_year"] = 0
 
-        movie = Movie.objects.create(series=series_obj, **validated_data)
+        movie, created = create_unique(Movie, movie_name, dict(validated_data, series=series_obj))
+        if not created:
+            return movie
 
         all_genres = user_genres if user_genres is not None else fetched_genres
         genre_objs = []
@@ -135,4 +229,14 @@ class MovieSerializer(serializers.Serializer):
 
         if genre_objs:
             movie.genre.set(genre_objs)
-        return movie
\ No newline at end of file
+        return movie
+
+    def update(self, instance, validated_data):
+        user_genres = validated_data.pop("genre", None)
+        for key, value in validated_data.items():
+            setattr(instance, key, value)
+        save_unique(instance)
+
+        if user_genres is not None:
+            instance.genre.set([Genre.objects.get_or_create(name=name)[0] for name in user_genres if name])
+        return instance
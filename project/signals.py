@@ -0,0 +1,103 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import readmodel, similarity
+from .models import ChangeLog, Genre, Movie, Series
+
+# Every mutation that changes a Series or Movie representation is written to
+# the ChangeLog so clients can pull deltas from /changes/ and re-rendered into
+# the read model; the ones touching genres or release years also have the
+# similarity index catch up with the log once committed. Changes seen before they hit the database
+# (pre_delete, pre_clear) stash the affected ids and render them afterwards.
+
+
+def changed(kind, pks, action=ChangeLog.UPSERT, reindex=True, render=True):
+    pks = list(pks)
+    if not pks:
+        return
+    ChangeLog.record(kind, pks, action)
+    if render and action == ChangeLog.UPSERT:
+        readmodel.refresh(kind, pks)
+    if reindex:
+        transaction.on_commit(lambda: similarity.objects_changed(kind))
+
+
+@receiver(post_save, sender=Series)
+def series_saved(sender, instance, created, **kwargs):
+    # genres reindex through m2m_changed; of the row itself only the year is scored
+    changed("series", [instance.pk], reindex=instance.has_changed("release_year"))
+    if not created and instance.has_changed("name"):
+        # movies embed their series' name
+        changed("movie", instance.movies.values_list("pk", flat=True), reindex=False)
+
+
+@receiver(pre_delete, sender=Series)
+def series_deleting(sender, instance, **kwargs):
+    # on_delete=SET_DEFAULT moves the movies without sending post_save
+    instance._moved_movies = list(instance.movies.values_list("pk", flat=True))
+    changed("movie", instance._moved_movies, reindex=False, render=False)
+
+
+@receiver(post_delete, sender=Series)
+def series_deleted(sender, instance, **kwargs):
+    changed("series", [instance.pk], ChangeLog.DELETE)
+    readmodel.refresh("movie", getattr(instance, "_moved_movies", []))
+
+
+@receiver(post_save, sender=Movie)
+def movie_saved(sender, instance, **kwargs):
+    changed("movie", [instance.pk], reindex=instance.has_changed("release_year"))
+
+
+@receiver(post_delete, sender=Movie)
+def movie_deleted(sender, instance, **kwargs):
+    changed("movie", [instance.pk], ChangeLog.DELETE)
+
+
+@receiver(m2m_changed, sender=Series.genre.through)
+def series_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    genres_changed("series", Series, instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Movie.genre.through)
+def movie_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    genres_changed("movie", Movie, instance, action, reverse, pk_set)
+
+
+def genres_changed(kind, model, instance, action, reverse, pk_set):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            changed(kind, [instance.pk])
+    elif action in ("post_add", "post_remove"):
+        changed(kind, pk_set)
+    elif action == "pre_clear":
+        # genre.<kind>_set.clear(): read the affected objects before the rows go
+        instance._cleared = list(model.objects.filter(genre=instance).values_list("pk", flat=True))
+        changed(kind, instance._cleared, render=False)
+    elif action == "post_clear":
+        readmodel.refresh(kind, getattr(instance, "_cleared", []))
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance, created, **kwargs):
+    if not created:
+        # a rename changes the payloads, not the genre memberships
+        changed("series", Series.objects.filter(genre=instance).values_list("pk", flat=True), reindex=False)
+        changed("movie", Movie.objects.filter(genre=instance).values_list("pk", flat=True), reindex=False)
+
+
+@receiver(pre_delete, sender=Genre)
+def genre_deleting(sender, instance, **kwargs):
+    instance._members = {
+        "series": list(Series.objects.filter(genre=instance).values_list("pk", flat=True)),
+        "movie": list(Movie.objects.filter(genre=instance).values_list("pk", flat=True)),
+    }
+    for kind, pks in instance._members.items():
+        changed(kind, pks, render=False)
+
+
+@receiver(post_delete, sender=Genre)
+def genre_deleted(sender, instance, **kwargs):
+    for kind, pks in getattr(instance, "_members", {}).items():
+        readmodel.refresh(kind, pks)
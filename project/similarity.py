@@ -0,0 +1,320 @@
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+from .models import ChangeLog, Movie, Series
+
+MODELS = {"series": Series, "movie": Movie}
+
+
+class SimilarityIndex:
+    """Top-K "more like this" neighbours for one model.
+
+    Every object is a row: a genre bitset (one column per genre id) plus its
+    release year. Scores are genre Jaccard blended with year proximity; the
+    top-K neighbour ids per row are precomputed in batches, kept current
+    row-by-row by replaying the ChangeLog past the seq the index was saved
+    at, and persisted as .npz so a new worker only has to load the file.
+    Builds and catch-ups hold an exclusive lock on a sibling .lock file, so
+    workers apply them one after another, each on top of the index the
+    previous one saved.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.model = MODELS[kind]
+        self.path = Path(settings.SIMILARITY_INDEX_DIR) / f"{kind}.npz"
+        self.lock_path = self.path.with_suffix(".lock")
+        self.lock = threading.RLock()
+        self.loaded_version = None
+        self.reset()
+
+    @contextmanager
+    def writing(self):
+        with self.lock:
+            if fcntl is None:
+                yield
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def reset(self):
+        k = settings.SIMILARITY_TOP_K
+        self.ids = np.empty(0, dtype=np.int64)
+        self.genre_ids = np.empty(0, dtype=np.int64)
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.years = np.zeros(0, dtype=np.float32)
+        self.neighbour_ids = np.empty((0, k), dtype=np.int64)
+        self.scores = np.empty((0, k), dtype=np.float32)
+        self.rows = {}
+        # every change logged up to this seq is reflected in the rows
+        self.seq = None
+
+    # -------- building -------- #
+
+    def build(self):
+        with self.writing():
+            self.rebuild()
+
+    def rebuild(self):
+        self.reset()
+        self.seq = settled_seq()
+        objects = list(self.model.objects.values_list("pk", "release_year"))
+        memberships = list(self.model.genre.through.objects.values_list(self.owner_column, "genre_id"))
+
+        self.ids = np.array([pk for pk, _ in objects], dtype=np.int64)
+        self.years = np.array([year or 0 for _, year in objects], dtype=np.float32)
+        self.rows = {pk: row for row, pk in enumerate(self.ids.tolist())}
+        self.genre_ids = np.array(sorted({genre_id for _, genre_id in memberships}), dtype=np.int64)
+
+        columns = {genre_id: col for col, genre_id in enumerate(self.genre_ids.tolist())}
+        self.vectors = np.zeros((len(self.ids), len(self.genre_ids)), dtype=np.float32)
+        for pk, genre_id in memberships:
+            self.vectors[self.rows[pk], columns[genre_id]] = 1
+
+        self.neighbour_ids = np.full((len(self.ids), settings.SIMILARITY_TOP_K), -1, dtype=np.int64)
+        self.scores = np.zeros((len(self.ids), settings.SIMILARITY_TOP_K), dtype=np.float32)
+        self.recompute(np.arange(len(self.ids)))
+        self.save()
+
+    @property
+    def owner_column(self):
+        return f"{self.model._meta.model_name}_id"
+
+    def score_rows(self, rows):
+        """Scores of ``rows`` against every row, shape (len(rows), n)."""
+        vectors = self.vectors[rows]
+        intersection = vectors @ self.vectors.T
+        sizes = self.vectors.sum(axis=1)
+        union = sizes[rows][:, None] + sizes[None, :] - intersection
+        jaccard = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+        years = self.years[rows][:, None]
+        proximity = np.exp(-np.abs(years - self.years[None, :]) / settings.SIMILARITY_YEAR_SCALE)
+        proximity[(years == 0) | (self.years[None, :] == 0)] = 0
+
+        weight = settings.SIMILARITY_YEAR_WEIGHT
+        scores = (1 - weight) * jaccard + weight * proximity
+        scores[np.arange(len(rows)), rows] = -np.inf
+        return scores
+
+    def recompute(self, rows, chunk=512):
+        k = min(settings.SIMILARITY_TOP_K, max(len(self.ids) - 1, 0))
+        for start in range(0, len(rows), chunk):
+            batch = rows[start:start + chunk]
+            self.neighbour_ids[batch] = -1
+            self.scores[batch] = 0
+            if not k:
+                continue
+            scores = self.score_rows(batch)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            self.neighbour_ids[batch, :k] = self.ids[np.take_along_axis(top, order, axis=1)]
+            self.scores[batch, :k] = np.take_along_axis(top_scores, order, axis=1)
+
+    # -------- incremental updates -------- #
+
+    def catch_up(self):
+        """Apply the ChangeLog entries the persisted index has not seen yet,
+        or build it if there is none (or it predates seq tracking)."""
+        with self.writing():
+            if not self.refresh() or self.seq is None:
+                self.rebuild()
+                return
+            settled = settled_seq()
+            pks = set(ChangeLog.objects.filter(kind=self.kind, seq__gt=self.seq).values_list("object_id", flat=True))
+            if pks:
+                self.update(list(pks))
+                # entries past the settled seq are applied again next time
+                self.seq = max(self.seq, settled)
+                self.save()
+
+    def update(self, pks):
+        """Re-read ``pks`` from the database and refresh every row whose
+        top-K could have changed because of them; the caller saves."""
+        existing = dict(self.model.objects.filter(pk__in=pks).values_list("pk", "release_year"))
+        memberships = self.model.genre.through.objects.filter(
+            **{f"{self.owner_column}__in": list(existing)}
+        ).values_list(self.owner_column, "genre_id")
+
+        removed = [pk for pk in pks if pk not in existing and pk in self.rows]
+        if removed:
+            self.remove(removed)
+
+        new_genres = sorted({genre_id for _, genre_id in memberships} - set(self.genre_ids.tolist()))
+        if new_genres:
+            self.genre_ids = np.concatenate([self.genre_ids, np.array(new_genres, dtype=np.int64)])
+            padding = np.zeros((len(self.ids), len(new_genres)), dtype=np.float32)
+            self.vectors = np.hstack([self.vectors, padding])
+        columns = {genre_id: col for col, genre_id in enumerate(self.genre_ids.tolist())}
+
+        added = [pk for pk in existing if pk not in self.rows]
+        if added:
+            self.append(added)
+
+        changed = np.array([self.rows[pk] for pk in existing], dtype=np.int64)
+        self.vectors[changed] = 0
+        for pk, genre_id in memberships:
+            self.vectors[self.rows[pk], columns[genre_id]] = 1
+        self.years[changed] = [existing[pk] or 0 for pk in self.ids[changed].tolist()]
+
+        affected = np.isin(self.neighbour_ids, list(pks)).any(axis=1)
+        if len(changed):
+            # rows the changed objects now beat the K-th neighbour of
+            challenger = self.score_rows(changed).max(axis=0)
+            affected |= challenger > self.scores[:, -1]
+            affected |= (self.neighbour_ids == -1).any(axis=1)
+            affected[changed] = True
+        self.recompute(np.flatnonzero(affected))
+
+    def append(self, pks):
+        count = len(pks)
+        self.ids = np.concatenate([self.ids, np.array(pks, dtype=np.int64)])
+        self.years = np.concatenate([self.years, np.zeros(count, dtype=np.float32)])
+        self.vectors = np.vstack([self.vectors, np.zeros((count, len(self.genre_ids)), dtype=np.float32)])
+        self.neighbour_ids = np.vstack([self.neighbour_ids, np.full((count, self.neighbour_ids.shape[1]), -1)])
+        self.scores = np.vstack([self.scores, np.zeros((count, self.scores.shape[1]), dtype=np.float32)])
+        self.rows = {pk: row for row, pk in enumerate(self.ids.tolist())}
+
+    def remove(self, pks):
+        keep = ~np.isin(self.ids, pks)
+        self.ids = self.ids[keep]
+        self.years = self.years[keep]
+        self.vectors = self.vectors[keep]
+        self.neighbour_ids = self.neighbour_ids[keep]
+        self.scores = self.scores[keep]
+        self.rows = {pk: row for row, pk in enumerate(self.ids.tolist())}
+
+    # -------- persistence -------- #
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                ids=self.ids,
+                genre_ids=self.genre_ids,
+                vectors=self.vectors.astype(np.bool_),
+                years=self.years,
+                neighbour_ids=self.neighbour_ids,
+                scores=self.scores,
+                seq=self.seq,
+            )
+        os.replace(tmp, self.path)
+        self.loaded_version = self.version()
+
+    def version(self):
+        # every save replaces the file, so the inode tells saves apart even
+        # within one mtime tick
+        stat = self.path.stat()
+        return stat.st_ino, stat.st_mtime_ns
+
+    def refresh(self):
+        """Load the persisted index if another process wrote a newer one.
+        Returns False when there is no index on disk yet."""
+        try:
+            version = self.version()
+        except FileNotFoundError:
+            return False
+        if version != self.loaded_version:
+            with np.load(self.path) as data:
+                self.ids = data["ids"]
+                self.genre_ids = data["genre_ids"]
+                self.vectors = data["vectors"].astype(np.float32)
+                self.years = data["years"]
+                self.neighbour_ids = data["neighbour_ids"]
+                self.scores = data["scores"]
+                self.seq = int(data["seq"]) if "seq" in data.files else None
+            self.rows = {pk: row for row, pk in enumerate(self.ids.tolist())}
+            self.loaded_version = version
+        return True
+
+    def similar(self, pk, limit=None):
+        """[(neighbour_pk, score)] for ``pk``, best first, or None while no
+        index has been built (one is then scheduled)."""
+        with self.lock:
+            if not self.refresh():
+                schedule_catch_up(self.kind)
+                return None
+            row = self.rows.get(pk)
+            if row is None:
+                return []
+            pairs = zip(self.neighbour_ids[row].tolist(), self.scores[row].tolist())
+            return [(other, score) for other, score in pairs if other != -1 and score > 0][:limit]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(kind):
+    with _indexes_lock:
+        if kind not in _indexes:
+            _indexes[kind] = SimilarityIndex(kind)
+        return _indexes[kind]
+
+
+def settled_seq():
+    """Newest ChangeLog seq no transaction still in flight can commit below
+    (see CHANGE_FEED_SAFETY_LAG)."""
+    entries = ChangeLog.objects.all()
+    if settings.CHANGE_FEED_SAFETY_LAG:
+        cutoff = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_SAFETY_LAG)
+        entries = entries.filter(created_at__lte=cutoff)
+    return entries.order_by("-seq").values_list("seq", flat=True).first() or 0
+
+
+# builds and catch-ups run here, off the request path, one at a time
+_update_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="similarity")
+_scheduled = set()
+_scheduled_lock = threading.Lock()
+
+
+def schedule_catch_up(kind):
+    """Catch the persisted index for ``kind`` up with the ChangeLog in the
+    background. A catch-up still waiting to start covers every change logged
+    before it runs, so it is only queued once."""
+    with _scheduled_lock:
+        if kind in _scheduled:
+            return
+        _scheduled.add(kind)
+
+    def run():
+        with _scheduled_lock:
+            _scheduled.discard(kind)
+        try:
+            get_index(kind).catch_up()
+        except Exception as e:
+            print("Similarity index update error:", e)
+        finally:
+            connection.close()
+
+    _update_executor.submit(run)
+
+
+def objects_changed(kind):
+    """Bring the persisted index for ``kind`` (if one was built) up to date
+    once a transaction that changed ``kind`` objects has committed."""
+    if get_index(kind).path.exists():
+        schedule_catch_up(kind)
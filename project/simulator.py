@@ -0,0 +1,197 @@
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from .models import normalize_title
+
+# Stand-in for Jikan, TMDB and OMDb serving recorded responses, so the
+# enrichment path can be load-tested offline. Mounted under /jikan, /tmdb
+# and /omdb; point JIKAN_BASE_URL, TMDB_BASE_URL and OMDB_BASE_URL at it.
+# Every fault decision and latency sample is derived from (seed, provider,
+# request number), so a run with the same settings sees the same faults.
+
+DEFAULT_FIXTURES = Path(__file__).with_name("simulator_fixtures.json")
+PROVIDERS = ("jikan", "tmdb", "omdb")
+SYNTHETIC_GENRES = ["Action", "Adventure", "Comedy", "Drama", "Fantasy", "Romance", "Sci-Fi", "Slice of Life"]
+
+
+def parse_latency(spec):
+    """"fixed:MS", "uniform:LO,HI" or "lognormal:MEDIAN,SIGMA" (all in ms)
+    -> function of a Random returning a delay in seconds."""
+    kind, _, args = spec.partition(":")
+    try:
+        values = [float(v) for v in args.split(",")] if args else []
+        if kind == "fixed" and len(values) == 1:
+            return lambda rng: values[0] / 1000
+        if kind == "uniform" and len(values) == 2:
+            return lambda rng: rng.uniform(*values) / 1000
+        if kind == "lognormal" and len(values) == 2:
+            mu = math.log(values[0])
+            return lambda rng: rng.lognormvariate(mu, values[1]) / 1000
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency spec: {spec!r}")
+
+
+def load_fixtures(path):
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    fixtures = {
+        "jikan": {normalize_title(t): body for t, body in raw.get("jikan", {}).items()},
+        "tmdb": {
+            media_type: {normalize_title(t): body for t, body in bodies.items()}
+            for media_type, bodies in raw.get("tmdb", {}).items()
+        },
+        "omdb": {normalize_title(t): body for t, body in raw.get("omdb", {}).items()},
+    }
+    fixtures["jikan_external"] = {
+        entry["search"]["data"][0]["mal_id"]: entry.get("external", {"data": []})
+        for entry in fixtures["jikan"].values()
+        if entry["search"].get("data")
+    }
+    return fixtures
+
+
+def title_hash(title):
+    return int(hashlib.sha256(normalize_title(title).encode("utf-8")).hexdigest()[:12], 16)
+
+
+class ProviderSimulator:
+    def __init__(self, fixtures, latency, error_rate=0.0, burst_every=0, burst_length=0, seed=0, synthesize=True):
+        self.fixtures = fixtures
+        self.latency = latency  # provider -> sampler
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.seed = seed
+        self.synthesize = synthesize
+        self.lock = threading.Lock()
+        self.requests = {provider: 0 for provider in PROVIDERS}
+        self.responses = {provider: {} for provider in PROVIDERS}
+
+    def handle(self, path, query):
+        """Return (status, body, headers) for one simulated request."""
+        parts = [p for p in path.split("/") if p]
+        provider = parts[0] if parts and parts[0] in PROVIDERS else None
+        if provider is None:
+            if parts == ["_stats"]:
+                return 200, self.stats(), {}
+            return 404, {"error": "Unknown provider"}, {}
+
+        with self.lock:
+            number = self.requests[provider]
+            self.requests[provider] += 1
+        rng = random.Random(f"{self.seed}:{provider}:{number}")
+
+        if self.burst_every and number % self.burst_every >= self.burst_every - self.burst_length:
+            status, body, headers = 429, {"error": "Too Many Requests"}, {"Retry-After": "1"}
+        else:
+            time.sleep(self.latency[provider](rng))
+            if rng.random() < self.error_rate:
+                status, body, headers = 503, {"error": "Service Unavailable"}, {}
+            else:
+                status, body = getattr(self, provider)(parts[1:], query)
+                headers = {}
+
+        with self.lock:
+            counts = self.responses[provider]
+            counts[status] = counts.get(status, 0) + 1
+        return status, body, headers
+
+    def stats(self):
+        with self.lock:
+            return {
+                provider: {"requests": self.requests[provider], "responses": dict(self.responses[provider])}
+                for provider in PROVIDERS
+            }
+
+    # -------- providers -------- #
+
+    def jikan(self, parts, query):
+        if parts == ["anime"]:
+            title = query.get("q", "")
+            entry = self.fixtures["jikan"].get(normalize_title(title))
+            if entry is not None:
+                return 200, entry["search"]
+            if not self.synthesize:
+                return 200, {"data": []}
+            return 200, {"data": [self.synthetic_anime(title)]}
+
+        if len(parts) == 3 and parts[0] == "anime" and parts[2] == "external" and parts[1].isdigit():
+            mal_id = int(parts[1])
+            if mal_id in self.fixtures["jikan_external"]:
+                return 200, self.fixtures["jikan_external"][mal_id]
+            links = [{"name": "Official Site", "url": f"https://example.com/anime/{mal_id}"}]
+            if mal_id % 2 == 0:
+                links.append({"name": "Crunchyroll", "url": f"https://www.crunchyroll.com/series/sim{mal_id}"})
+            return 200, {"data": links}
+        return 404, {"status": 404, "message": "Resource does not exist"}
+
+    def tmdb(self, parts, query):
+        if len(parts) != 2 or parts[0] != "search":
+            return 404, {"status_message": "The resource you requested could not be found."}
+        title = query.get("query", "")
+        body = self.fixtures["tmdb"].get(parts[1], {}).get(normalize_title(title))
+        if body is not None:
+            return 200, body
+        if not self.synthesize:
+            return 200, {"page": 1, "results": [], "total_results": 0}
+        return 200, {"page": 1, "results": [{"id": title_hash(title) % 10**6, "name": title}], "total_results": 1}
+
+    def omdb(self, parts, query):
+        title = query.get("t", "")
+        body = self.fixtures["omdb"].get(normalize_title(title))
+        if body is not None:
+            return 200, body
+        if not self.synthesize:
+            return 200, {"Response": "False", "Error": "Movie not found!"}
+        return 200, {"Title": title, "imdbID": f"tt{title_hash(title) % 10**7:07d}", "Response": "True"}
+
+    @staticmethod
+    def synthetic_anime(title):
+        h = title_hash(title)
+        year = 1990 + h % 35
+        genres = [SYNTHETIC_GENRES[(h >> shift) % len(SYNTHETIC_GENRES)] for shift in (0, 8)]
+        return {
+            "mal_id": h % 10**6,
+            "title": title,
+            "synopsis": f"Simulated synopsis for {title}.",
+            "year": year,
+            "aired": {"prop": {"from": {"year": year}}},
+            "images": {"jpg": {"large_image_url": f"https://cdn.example.com/images/{h % 10**6}l.jpg"}},
+            "genres": [{"name": name} for name in dict.fromkeys(genres)],
+            "streaming": [],
+        }
+
+
+def make_server(simulator, host, port, log=False):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            status, body, headers = simulator.handle(url.path, query)
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            if log:
+                super().log_message(format, *args)
+
+    return SimulatorServer((host, port), Handler)
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
@@ -0,0 +1,109 @@
+import hashlib
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import EnrichmentFetch, normalize_title
+
+
+# Concurrent enrichments of the same title share one upstream fetch.
+# Threads of one worker wait on an Event, other workers wait on the
+# EnrichmentFetch row the leader inserted and read the result it stores.
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.result = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+def flight_key(*parts):
+    raw = ":".join(normalize_title(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def single_flight(key, fn):
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        call.done.wait(settings.SINGLE_FLIGHT_WAIT_TIMEOUT)
+        if call.ok:
+            return call.result
+        return fn()
+
+    try:
+        call.result = _shared_fetch(key, fn)
+        call.ok = True
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.done.set()
+    return call.result
+
+
+def _shared_fetch(key, fn):
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+
+    while True:
+        owned, row = _claim(key)
+        if owned:
+            break
+        if row is not None and row.finished_at:
+            return row.result
+        if time.monotonic() >= deadline:
+            return fn()
+        time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+
+    try:
+        result = fn()
+    except Exception:
+        EnrichmentFetch.objects.filter(key=key, finished_at__isnull=True).delete()
+        raise
+
+    now = timezone.now()
+    EnrichmentFetch.objects.filter(key=key).update(result=result, finished_at=now)
+    EnrichmentFetch.objects.filter(
+        finished_at__lt=now - timedelta(seconds=settings.SINGLE_FLIGHT_RESULT_TTL)
+    ).delete()
+    return result
+
+
+def _claim(key):
+    """Return (owned, row): owned when this caller must run the fetch,
+    otherwise the row another worker is filling (None if it vanished)."""
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            EnrichmentFetch.objects.create(key=key, started_at=now)
+        return True, None
+    except IntegrityError:
+        pass
+
+    row = EnrichmentFetch.objects.filter(key=key).first()
+    if row is None:
+        return False, None
+
+    if row.finished_at:
+        fresh = row.finished_at >= now - timedelta(seconds=settings.SINGLE_FLIGHT_RESULT_TTL)
+    else:
+        fresh = row.started_at >= now - timedelta(seconds=settings.SINGLE_FLIGHT_WAIT_TIMEOUT)
+    if fresh:
+        return False, row
+
+    # Stale row: take it over unless another worker beat us to it.
+    taken = EnrichmentFetch.objects.filter(pk=row.pk, started_at=row.started_at).update(
+        started_at=now, finished_at=None, result=None
+    )
+    return bool(taken), None
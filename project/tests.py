@@ -1,3 +1,842 @@
-from django.test import TestCase
+import json
+import os
+import pstats
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import autocomplete, readmodel, routers, similarity
+from .admission import EnrichmentRateThrottle
+from .models import AdmissionLease, ChangeLog, EnrichmentFetch, Genre, IdempotencyKey, Movie, Series
+from .serializers import DUPLICATE_TITLE_ERROR
+from .warmup import warm
+
+# Provider calls are stubbed with fixed results; each stub counts its calls
+# and can be slowed down so concurrent requests overlap inside it.
+
+JIKAN_RESULT = {
+    "about": "Stubbed synopsis.",
+    "poster": "https://cdn.example.com/poster.jpg",
+    "release_year": 2001,
+    "genre": ["Action"],
+    "crunchyroll": None,
+}
+TMDB_RESULT = {"tmdb": "https://www.themoviedb.org/tv/1/watch?locale=US"}
+OMDB_RESULT = "https://www.imdb.com/title/tt0000001/"
+
+STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
+
+
+class ProviderStubMixin:
+    provider_delay = 0
+
+    def setUp(self):
+        super().setUp()
+        # no similarity index to update, and no cached provider results
+        # carried from one request to the next
+        overrides = self.settings(SIMILARITY_INDEX_DIR=tempfile.mkdtemp(), SINGLE_FLIGHT_RESULT_TTL=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client = APIClient()
+        self.calls = Counter()
+        self.calls_lock = threading.Lock()
+        similarity._indexes.clear()
+        caches["throttle"].clear()
+
+        stubs = {
+            "project.utils.fetch_jikan_anime": ("jikan", JIKAN_RESULT),
+            "project.utils.fetch_tmdb_streaming": ("tmdb", TMDB_RESULT),
+            "project.utils.fetch_omdb_imdb_link": ("omdb", OMDB_RESULT),
+        }
+        for target, (provider, result) in stubs.items():
+            patcher = mock.patch(target, self.stub(provider, result))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def stub(self, provider, result):
+        def fetch(title, *args, **kwargs):
+            with self.calls_lock:
+                self.calls[provider] += 1
+            time.sleep(self.provider_delay)
+            return result
+
+        return fetch
+
+    def concurrently(self, *requests):
+        """Run each (method, path, data, headers) request from its own thread
+        and return the responses in order."""
+        barrier = threading.Barrier(len(requests))
+
+        def send(request):
+            method, path, data, headers = request
+            try:
+                barrier.wait()
+                return getattr(APIClient(), method)(path, data, format="json", headers=headers)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+            return list(pool.map(send, requests))
+
+
+class SingleFlightTests(ProviderStubMixin, TransactionTestCase):
+    provider_delay = 0.3
+
+    def test_concurrent_creates_of_one_title_share_the_provider_calls(self):
+        responses = self.concurrently(
+            *[("post", "/anime_series/", {"name": "Shared Title", "release_year": year}, {}) for year in (2001, 2002)],
+            ("post", "/anime_series/", {"name": "shared  title", "release_year": 2003}, {}),
+        )
+
+        self.assertEqual([r.status_code for r in responses], [200, 200, 200])
+        self.assertEqual(Series.objects.filter(normalized_name="shared title").count(), 3)
+        self.assertEqual(self.calls, Counter(jikan=1, tmdb=1, omdb=1))
+
+    def test_different_titles_are_fetched_separately(self):
+        responses = self.concurrently(
+            ("post", "/anime_series/", {"name": "First Title"}, {}),
+            ("post", "/anime_series/", {"name": "Second Title"}, {}),
+        )
+
+        self.assertEqual([r.status_code for r in responses], [200, 200])
+        self.assertEqual(self.calls, Counter(jikan=2, tmdb=2, omdb=2))
+
+
+class RenderingTests(ProviderStubMixin, TestCase):
+    def test_list_field_errors_are_rendered(self):
+        # DRF keys ListField errors by item index, which orjson rejects by default
+        response = self.client.post("/anime_series/", {"name": "X", "genre": [["nested"]]}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"genre": {"0": ["Not a valid string."]}})
+
+    def test_list_field_errors_are_rendered_by_the_bulk_endpoint(self):
+        series = Series.objects.create(name="Bulk Target", about="", release_year=2001)
+
+        response = self.client.patch("/anime_series/bulk/", [{"id": series.pk, "genre": [["nested"]]}], format="json")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["results"][0]["errors"], {"genre": {"0": ["Not a valid string."]}})
+
+    def test_api_responses_are_compressed(self):
+        ids = [Series.objects.create(name=f"Series {i}", about="x" * 200, release_year=2000 + i).pk for i in range(5)]
+
+        response = self.client.get(
+            "/anime_series/", {"ids": ",".join(map(str, ids))}, headers={"accept-encoding": "gzip"}
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    # the manifest storage needs collectstatic first
+    @override_settings(STORAGES={**settings.STORAGES, "staticfiles": {"BACKEND": STATICFILES_STORAGE}})
+    def test_html_pages_are_not_compressed(self):
+        # HTML carries CSRF tokens, see COMPRESSION_CONTENT_TYPES
+        response = self.client.get("/admin/login/", headers={"accept-encoding": "gzip, br"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+
+@override_settings(ENRICHMENT_MAX_IN_FLIGHT=1)
+class AdmissionTests(ProviderStubMixin, TestCase):
+    def test_create_is_rejected_when_all_slots_are_taken(self):
+        AdmissionLease.objects.create(slot=0)
+
+        response = self.client.post("/anime_series/", {"name": "Rejected"}, format="json")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], str(settings.ENRICHMENT_RETRY_AFTER))
+        self.assertEqual(self.calls, Counter())
+        self.assertFalse(Series.objects.filter(name="Rejected").exists())
+
+    def test_stale_lease_is_reclaimed(self):
+        # left behind by a worker that died mid-enrichment
+        stale = timezone.now() - timedelta(seconds=settings.ENRICHMENT_LEASE_TTL + 1)
+        AdmissionLease.objects.create(slot=0, acquired_at=stale)
+
+        response = self.client.post("/anime_series/", {"name": "Admitted"}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(AdmissionLease.objects.exists())
+
+    def test_lease_is_released_after_a_failed_create(self):
+        response = self.client.post("/anime_series/", {}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AdmissionLease.objects.exists())
+
+    def test_reads_are_not_admission_controlled(self):
+        AdmissionLease.objects.create(slot=0)
+        series = Series.objects.create(name="Readable", about="", release_year=2001)
+
+        self.assertEqual(self.client.get(f"/anime_series/{series.pk}/").status_code, 200)
+
+    @mock.patch.object(EnrichmentRateThrottle, "THROTTLE_RATES", {"enrichment": "2/min"})
+    def test_creates_are_rate_limited_per_client(self):
+        statuses = [
+            self.client.post("/anime_series/", {"name": f"Rated {i}"}, format="json").status_code for i in range(3)
+        ]
+
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(self.client.get("/anime_series/?ids=1").status_code, 200)
+
+
+class IdempotentCreateTests(ProviderStubMixin, TestCase):
+    def post(self, data, key=None):
+        headers = {"Idempotency-Key": key} if key else {}
+        return self.client.post("/anime_series/", data, format="json", headers=headers)
+
+    def test_retry_with_the_same_key_replays_the_first_result(self):
+        first = self.post({"name": "Cowboy Bebop"}, key="retry-1")
+        second = self.post({"name": "Cowboy Bebop"}, key="retry-1")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(second.json()["id"], first.json()["id"])
+        self.assertEqual(Series.objects.count(), 1)
+        self.assertEqual(self.calls, Counter(jikan=1, tmdb=1, omdb=1))
+
+    def test_reusing_a_key_with_another_body_is_rejected(self):
+        self.post({"name": "Cowboy Bebop"}, key="retry-2")
+
+        response = self.post({"name": "Trigun"}, key="retry-2")
+
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Series.objects.filter(name="Trigun").exists())
+
+    def test_replaying_a_deleted_object_is_gone(self):
+        created = self.post({"name": "Cowboy Bebop"}, key="retry-3")
+        Series.objects.filter(pk=created.json()["id"]).delete()
+
+        self.assertEqual(self.post({"name": "Cowboy Bebop"}, key="retry-3").status_code, 410)
+
+    def test_create_of_an_existing_title_and_year_returns_it(self):
+        first = self.post({"name": "Cowboy Bebop", "release_year": 1998})
+        second = self.post({"name": "  cowboy   BEBOP ", "release_year": 1998})
+
+        self.assertEqual(second.json()["id"], first.json()["id"])
+        self.assertEqual(Series.objects.count(), 1)
+        self.assertEqual(self.calls, Counter(jikan=1, tmdb=1, omdb=1))
+
+    def test_rename_onto_an_existing_title_and_year_is_rejected(self):
+        Series.objects.create(name="Cowboy Bebop", about="", release_year=1998)
+        other = Series.objects.create(name="Trigun", about="", release_year=1998)
+
+        response = self.client.patch(f"/anime_series/{other.pk}/", {"name": "Cowboy  Bebop"}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Series.objects.get(pk=other.pk).name, "Trigun")
+
+    def test_legacy_duplicate_can_still_be_edited(self):
+        # migration 0012 kept duplicates apart with a "#<pk>" suffix
+        original = Series.objects.create(name="Cowboy Bebop", about="", release_year=1998)
+        duplicate = Series.objects.create(name="Cowboy Bebop (dup)", about="", release_year=1998)
+        Series.objects.filter(pk=duplicate.pk).update(
+            name=original.name, normalized_name=f"{original.normalized_name}#{duplicate.pk}"
+        )
+
+        patched = self.client.patch(f"/anime_series/{duplicate.pk}/", {"about": "Edited"}, format="json")
+        bulk = self.client.patch("/anime_series/bulk/", [{"id": duplicate.pk, "about": "Again"}], format="json")
+
+        self.assertEqual(patched.status_code, 202)
+        self.assertEqual(bulk.json()["results"], [{"id": duplicate.pk, "status": "updated"}])
+        self.assertEqual(Series.objects.get(pk=duplicate.pk).normalized_name, f"cowboy bebop#{duplicate.pk}")
+
+
+class ConcurrentCreateTests(ProviderStubMixin, TransactionTestCase):
+    provider_delay = 0.3
+
+    def test_concurrent_creates_of_one_title_and_year_make_one_row(self):
+        responses = self.concurrently(
+            *[("post", "/anime_series/", {"name": "Cowboy Bebop", "release_year": 1998}, {}) for _ in range(3)]
+        )
+
+        self.assertEqual([r.status_code for r in responses], [200, 200, 200])
+        self.assertEqual(len({r.json()["id"] for r in responses}), 1)
+        self.assertEqual(Series.objects.count(), 1)
+
+    def test_concurrent_retries_with_one_key_make_one_row(self):
+        request = ("post", "/anime_series/", {"name": "Cowboy Bebop"}, {"Idempotency-Key": "retry-4"})
+
+        responses = self.concurrently(request, request)
+
+        self.assertEqual([r.status_code for r in responses], [200, 200])
+        self.assertEqual(len({r.json()["id"] for r in responses}), 1)
+        self.assertEqual(Series.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+
+@override_settings(STORAGES={**settings.STORAGES, "staticfiles": {"BACKEND": STATICFILES_STORAGE}})
+class AdminSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(self.user)
+        genre = Genre.objects.create(name="Action")
+        series = Series.objects.create(name="Cowboy Bebop", about="", release_year=1998)
+        series.genre.add(genre)
+        Movie.objects.create(movie_name="Cowboy Bebop: The Movie", series=series, release_year=2001)
+
+    def test_search_on_every_changelist(self):
+        for model in (Series, Movie, Genre):
+            with self.subTest(model=model.__name__):
+                url = reverse(f"admin:project_{model._meta.model_name}_changelist")
+                response = self.client.get(url, {"q": "  COWBOY " if model is not Genre else "act"})
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context["cl"].result_count, 1)
+
+    def test_autocomplete_widgets(self):
+        for model_name, field_name, term in (("series", "genre", "ac"), ("movie", "series", "cow")):
+            with self.subTest(field=f"{model_name}.{field_name}"):
+                response = self.client.get(
+                    "/admin/autocomplete/",
+                    {"app_label": "project", "model_name": model_name, "field_name": field_name, "term": term},
+                )
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()["results"]), 1)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # "replica_test" is a second SQLite file holding a snapshot of the test
+    # database taken in setUp, so it lags behind every later write like a
+    # real replica would
+
+    def setUp(self):
+        super().setUp()
+        self.series = Series.objects.create(name="Cowboy Bebop", about="Before", release_year=1998)
+
+        path = tempfile.NamedTemporaryFile(suffix=".sqlite3", delete=False).name
+        connections.settings["replica_test"] = {**connections.settings["default"], "NAME": path}
+        self.addCleanup(self.drop_replica)
+        # connect() directly: the alias is not in this test case's databases
+        connections["replica_test"].connect()
+        connections["default"].ensure_connection()
+        connections["default"].connection.backup(connections["replica_test"].connection)
+
+        overrides = self.settings(DATABASE_REPLICAS=["replica_test"])
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        routers._replica_cycle = None
+        self.addCleanup(setattr, routers, "_replica_cycle", None)
+
+    def drop_replica(self):
+        connections["replica_test"].close()
+        os.unlink(connections.settings["replica_test"]["NAME"])
+        del connections["replica_test"]
+        del connections.settings["replica_test"]
+
+    def reads(self):
+        return CaptureQueriesContext(connections["default"]), CaptureQueriesContext(connections["replica_test"])
+
+    def test_request_without_pin_reads_the_replica(self):
+        primary, replica = self.reads()
+        with primary, replica:
+            response = self.client.get(f"/anime_series/{self.series.pk}/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica.captured_queries)
+        self.assertFalse(primary.captured_queries)
+
+    def test_reads_after_a_write_are_pinned_to_the_primary(self):
+        self.client.patch(f"/anime_series/{self.series.pk}/", {"about": "After"}, content_type="application/json")
+
+        primary, replica = self.reads()
+        with primary, replica:
+            response = self.client.get(f"/anime_series/{self.series.pk}/")
+
+        self.assertEqual(response.json()["about"], ["After"])
+        self.assertFalse(replica.captured_queries)
+
+    def test_reads_outside_a_request_use_the_primary(self):
+        # migrations, management commands and on_commit hooks
+        self.assertEqual(Series.objects.db_manager().db, "default")
+        self.assertEqual(routers.PrimaryReplicaRouter().db_for_read(Series), "default")
+
+    def test_primary_only_models_ignore_the_request_replica(self):
+        with routers.read_from("replica_test"):
+            self.assertEqual(routers.PrimaryReplicaRouter().db_for_read(Series), "replica_test")
+            for model in (EnrichmentFetch, AdmissionLease, IdempotencyKey):
+                with self.subTest(model=model.__name__):
+                    self.assertEqual(routers.PrimaryReplicaRouter().db_for_read(model), "default")
+
+
+class MultiGetTests(TestCase):
+    def setUp(self):
+        self.series = [Series.objects.create(name=f"Series {i}", about="", release_year=2000 + i) for i in range(3)]
+
+    def test_results_keep_the_requested_order_and_report_missing_ids(self):
+        first, second, _ = (s.pk for s in self.series)
+        missing = max(s.pk for s in self.series) + 1
+
+        response = self.client.get("/anime_series/", {"ids": f"{second},{missing},{first},{second}"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.json()["results"]], [second, first])
+        self.assertEqual(response.json()["missing"], [missing])
+
+    def test_largest_id_is_accepted(self):
+        response = self.client.get("/movie/", {"ids": str(2**63 - 1)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"results": [], "missing": [2**63 - 1]})
+
+    def test_malformed_and_out_of_range_ids_are_rejected(self):
+        for raw in ("", ",", "a", "1,b", "-1", "1.5", "²", "١", str(2**63), "99999999999999999999999"):
+            for path in ("/anime_series/", "/movie/"):
+                with self.subTest(ids=raw, path=path):
+                    response = self.client.get(path, {"ids": raw})
+
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn("ids", response.json())
+
+
+@override_settings(AUTOCOMPLETE_VERSION_CHECK=0)
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        # every test builds its own index from its own rows
+        autocomplete._index = None
+        self.addCleanup(setattr, autocomplete, "_index", None)
+
+    def titles(self, q, **params):
+        response = self.client.get("/autocomplete/", {"q": q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [result["title"] for result in response.json()["results"]]
+
+    def test_larger_franchises_rank_first_then_titles(self):
+        small = Series.objects.create(name="Titan Small", about="", release_year=2001)
+        large = Series.objects.create(name="Titan Large", about="", release_year=2002)
+        Series.objects.create(name="Titan Alone", about="", release_year=2003)
+        Movie.objects.create(movie_name="Titan Movie A", series=large)
+        Movie.objects.create(movie_name="Titan Movie B", series=large)
+        Movie.objects.create(movie_name="Titan Movie C", series=small)
+
+        self.assertEqual(
+            self.titles("tit"),
+            ["Titan Large", "Titan Movie A", "Titan Movie B", "Titan Movie C", "Titan Small", "Titan Alone"],
+        )
+        self.assertEqual(self.titles("tit", type="series", limit=2), ["Titan Large", "Titan Small"])
+
+    def test_broad_prefixes_rank_like_narrow_ones(self):
+        for i in range(30):
+            Series.objects.create(name=f"Series {i:02}", about="", release_year=2000 + i)
+        popular = Series.objects.create(name="Series Popular", about="", release_year=1999)
+        Movie.objects.create(movie_name="Popular Movie", series=popular)
+
+        with self.settings(AUTOCOMPLETE_MAX_SCAN=4):
+            self.assertEqual(self.titles("s", limit=3), ["Series Popular", "Series 00", "Series 01"])
+            self.assertEqual(self.titles("series 1", limit=2), ["Series 10", "Series 11"])
+
+    def test_matching_is_casefolded_and_by_word_start(self):
+        Series.objects.create(name="Attack on Titan", about="", release_year=2013)
+        Series.objects.create(name="Die Straße", about="", release_year=2001)
+        Series.objects.create(name="Pokémon", about="", release_year=1997)
+
+        self.assertEqual(self.titles("TITAN"), ["Attack on Titan"])
+        self.assertEqual(self.titles("  on   ti"), ["Attack on Titan"])
+        self.assertEqual(self.titles("STRASSE"), ["Die Straße"])
+        self.assertEqual(self.titles("POKÉ"), ["Pokémon"])
+        self.assertEqual(self.titles("poke"), [])
+        self.assertEqual(self.titles("ttan"), [])
+
+    def test_writes_show_up_without_a_rebuild(self):
+        renamed = Series.objects.create(name="Cowboy Bebop", about="", release_year=1998)
+        deleted = Series.objects.create(name="Cowboy Deleted", about="", release_year=1999)
+        self.assertEqual(self.titles("cowboy"), ["Cowboy Bebop", "Cowboy Deleted"])
+        built = autocomplete._index
+
+        renamed.name = "Space Cowboy"
+        renamed.save()
+        deleted.delete()
+        Series.objects.create(name="Cowboy New", about="", release_year=2000)
+
+        self.assertEqual(self.titles("cowboy"), ["Cowboy New", "Space Cowboy"])
+        self.assertEqual(self.titles("cowboy b"), [])
+        self.assertIs(autocomplete._index, built)
+
+    def test_movie_joining_a_franchise_reranks_it(self):
+        Series.objects.create(name="Gundam Wing", about="", release_year=1995)
+        second = Series.objects.create(name="Gundam Zeta", about="", release_year=1985)
+        self.assertEqual(self.titles("gundam"), ["Gundam Wing", "Gundam Zeta"])
+
+        Movie.objects.create(movie_name="Char's Counterattack", series=second)
+
+        self.assertEqual(self.titles("gundam"), ["Gundam Zeta", "Gundam Wing"])
+
+
+class WarmUpTests(ProviderStubMixin, TestCase):
+    def test_warm_loads_the_per_process_indexes(self):
+        series = Series.objects.create(name="Cowboy Bebop", about="", release_year=1998)
+        similarity.get_index("series").build()
+        similarity._indexes.clear()
+        autocomplete._index = None
+        self.addCleanup(setattr, autocomplete, "_index", None)
+
+        warm([])
+
+        self.assertEqual([entry[1] for entry in autocomplete._index.search("cowboy", 1)], [series.pk])
+        self.assertIn(series.pk, similarity._indexes["series"].rows)
+        # never built, so nothing to load
+        self.assertIsNone(similarity._indexes["movie"].loaded_version)
+
+
+class SimilarityTests(ProviderStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.genres = {name.lower(): Genre.objects.create(name=name) for name in ("Action", "Drama", "Comedy", "Mecha")}
+        self.series = {}
+        for name, year, genres in [
+            ("Bebop", 1998, ["action", "drama"]),
+            ("Trigun", 1998, ["action", "comedy"]),
+            ("Monster", 2004, ["drama"]),
+            ("Gintama", 2006, ["action", "comedy"]),
+            ("Clannad", 2007, ["drama", "comedy"]),
+        ]:
+            self.series[name] = self.create(name, year, genres)
+        self.index = similarity.get_index("series")
+
+    def create(self, name, year, genres):
+        series = Series.objects.create(name=name, about="", release_year=year)
+        series.genre.set([self.genres[genre] for genre in genres])
+        return series
+
+    def neighbours(self, index):
+        # under SIMILARITY_TOP_K objects, so every row lists all its neighbours
+        return {
+            pk: {other: round(score, 5) for other, score in index.similar(pk)}
+            for pk in Series.objects.values_list("pk", flat=True)
+        }
+
+    def test_catch_up_matches_a_full_rebuild(self):
+        self.index.build()
+
+        self.create("Gurren Lagann", 2007, ["action", "mecha"])
+        self.series["Monster"].genre.add(self.genres["action"])
+        self.series["Trigun"].release_year = 2005
+        self.series["Trigun"].save()
+        self.series["Clannad"].delete()
+        self.index.catch_up()
+
+        with self.settings(SIMILARITY_INDEX_DIR=tempfile.mkdtemp()):
+            rebuilt = similarity.SimilarityIndex("series")
+            rebuilt.build()
+        self.assertEqual(self.neighbours(self.index), self.neighbours(rebuilt))
+        self.assertEqual(sorted(self.index.genre_ids.tolist()), sorted(rebuilt.genre_ids.tolist()))
+
+    def test_catch_up_is_picked_up_by_other_workers(self):
+        self.index.build()
+        other = similarity.SimilarityIndex("series")
+        self.assertIsNotNone(other.similar(self.series["Bebop"].pk))
+
+        self.series["Bebop"].genre.set([self.genres["comedy"]])
+        self.index.catch_up()
+
+        self.assertEqual(self.neighbours(other), self.neighbours(self.index))
+
+    @mock.patch("project.similarity.schedule_catch_up")
+    def test_commits_schedule_a_catch_up_once_an_index_exists(self, schedule):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.series["Bebop"].genre.add(self.genres["mecha"])
+        schedule.assert_not_called()
+
+        self.index.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.series["Bebop"].release_year = 1999
+            self.series["Bebop"].save()
+
+        schedule.assert_called_once_with("series")
+
+    def test_similar_lists_the_closest_titles_first(self):
+        self.index.build()
+
+        response = self.client.get(f"/similar/series/{self.series['Trigun'].pk}/", {"fields": "id,name"})
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(results[0]["name"], "Gintama")
+        self.assertEqual(set(results[0]), {"score", "id", "name"})
+        self.assertEqual([r["score"] for r in results], sorted((r["score"] for r in results), reverse=True))
+
+    @mock.patch("project.similarity.schedule_catch_up")
+    def test_similar_without_an_index_is_unavailable(self, schedule):
+        response = self.client.get(f"/similar/series/{self.series['Bebop'].pk}/")
+
+        self.assertEqual(response.status_code, 503)
+        schedule.assert_called_once_with("series")
+        self.assertFalse(self.index.path.exists())
+
+    def test_similar_rejects_unknown_kinds_and_ids(self):
+        self.index.build()
+        missing = max(s.pk for s in self.series.values()) + 1
+
+        self.assertEqual(self.client.get(f"/similar/genre/{self.series['Bebop'].pk}/").status_code, 404)
+        self.assertEqual(self.client.get(f"/similar/series/{missing}/").status_code, 404)
+
+
+class ReadModelTests(ProviderStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # where on_delete=SET_DEFAULT moves the movies of a deleted series
+        self.default = Series.objects.filter(pk=1).first() or Series.objects.create(
+            pk=1, name="Unsorted", about="", release_year=None
+        )
+        self.action = Genre.objects.create(name="Action")
+        self.drama = Genre.objects.create(name="Drama")
+        self.series = Series.objects.create(name="Cowboy Bebop", about="", release_year=1998)
+        self.series.genre.set([self.action, self.drama])
+        self.movie = Movie.objects.create(movie_name="Knockin' on Heaven's Door", series=self.series)
+        self.movie.genre.set([self.action])
+
+    def assertRendered(self, *objs):
+        for obj in objs:
+            model = type(obj)
+            serializer_class = readmodel.READ_MODELS[model._meta.model_name][1]
+            current = serializer_class.prefetch_queryset(model.objects.filter(pk=obj.pk)).get()
+            with self.subTest(obj=current):
+                self.assertIsNotNone(current.rendered)
+                self.assertEqual(current.rendered, serializer_class().to_representation(current))
+
+    def test_patch(self):
+        response = self.client.patch(
+            f"/anime_series/{self.series.pk}/", {"name": "Bebop", "genre": ["Drama"]}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Movie.objects.get(pk=self.movie.pk).rendered["series"], {"name": "Bebop"})
+        self.assertRendered(self.series, self.movie)
+
+    def test_bulk_patch(self):
+        response = self.client.patch(
+            "/anime_series/bulk/", [{"id": self.series.pk, "name": "Bebop", "genre": ["Action"]}], format="json"
+        )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertRendered(self.series, self.movie)
+
+    def test_genre_rename(self):
+        self.action.name = "Adventure"
+        self.action.save()
+
+        self.assertIn({"name": "Adventure"}, Series.objects.get(pk=self.series.pk).rendered["genre"])
+        self.assertRendered(self.series, self.movie)
+
+    def test_genre_delete(self):
+        self.action.delete()
+
+        self.assertEqual(Movie.objects.get(pk=self.movie.pk).rendered["genre"], [])
+        self.assertRendered(self.series, self.movie)
+
+    def test_series_delete_moves_movies_to_the_default_series(self):
+        self.series.delete()
+
+        self.assertEqual(Movie.objects.get(pk=self.movie.pk).series_id, self.default.pk)
+        self.assertRendered(self.movie)
+
+    def test_migrate_renders_rows_without_a_representation(self):
+        Series.objects.update(rendered=None)
+        Movie.objects.update(rendered=None)
+
+        call_command("migrate", verbosity=0)
+
+        self.assertRendered(self.default, self.series, self.movie)
+
+
+class BulkUpdateTests(ProviderStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.bebop = Series.objects.create(name="Cowboy Bebop", about="", release_year=1998)
+        self.trigun = Series.objects.create(name="Trigun", about="", release_year=1998)
+        self.monster = Series.objects.create(name="Monster", about="", release_year=2004)
+        self.bebop.genre.set([Genre.objects.create(name="Action")])
+
+    def patch(self, path, items):
+        response = self.client.patch(path, items, format="json")
+        self.assertEqual(response.status_code, 202)
+        return [(result["status"], result.get("errors")) for result in response.json()["results"]]
+
+    def test_mixed_batch_reports_each_item(self):
+        missing = self.monster.pk + 100
+
+        results = self.patch("/anime_series/bulk/", [
+            {"id": self.bebop.pk, "about": "Space western", "genre": ["Drama", "Sci-Fi", "Drama"]},
+            {"id": missing, "about": "Nobody"},
+            {"id": "x"},
+            {"id": self.trigun.pk, "release_year": "soon"},
+            {"id": self.monster.pk, "name": "Monster (2004)"},
+        ])
+
+        self.assertEqual([status for status, _ in results], ["updated", "not_found", "invalid", "invalid", "updated"])
+        self.assertIn("release_year", results[3][1])
+        self.bebop.refresh_from_db()
+        self.assertEqual(self.bebop.about, "Space western")
+        self.assertEqual(sorted(self.bebop.genre.values_list("name", flat=True)), ["Drama", "Sci-Fi"])
+        self.assertEqual(Series.objects.get(pk=self.monster.pk).normalized_name, "monster (2004)")
+        self.assertEqual(Series.objects.get(pk=self.trigun.pk).release_year, 1998)
+
+    def test_title_clash_rejects_only_the_clashing_item(self):
+        results = self.patch("/anime_series/bulk/", [
+            {"id": self.trigun.pk, "name": "cowboy  BEBOP", "genre": ["Comedy"]},
+            {"id": self.monster.pk, "about": "Edited"},
+        ])
+
+        self.assertEqual(results[0], ("invalid", {"error": [DUPLICATE_TITLE_ERROR]}))
+        self.assertEqual(results[1], ("updated", None))
+        trigun = Series.objects.get(pk=self.trigun.pk)
+        self.assertEqual(trigun.name, "Trigun")
+        self.assertFalse(trigun.genre.exists())
+        self.assertEqual(Series.objects.get(pk=self.monster.pk).about, "Edited")
+
+    def test_title_clash_within_the_batch_keeps_the_first_item(self):
+        results = self.patch("/anime_series/bulk/", [
+            {"id": self.trigun.pk, "name": "Vash", "release_year": 2004},
+            {"id": self.monster.pk, "name": "vash"},
+            # moves off the title + year the next item takes
+            {"id": self.bebop.pk, "release_year": 1999},
+        ])
+
+        self.assertEqual([status for status, _ in results], ["updated", "invalid", "updated"])
+        self.assertEqual(Series.objects.get(pk=self.monster.pk).name, "Monster")
+
+    def test_movie_series_are_looked_up_once_per_batch(self):
+        movies = [Movie.objects.create(movie_name=f"Movie {i}", series=self.bebop) for i in range(6)]
+
+        def queries(count):
+            items = [{"id": movie.pk, "series": self.trigun.pk} for movie in movies[:count]]
+            with CaptureQueriesContext(connections["default"]) as captured:
+                self.assertEqual({status for status, _ in self.patch("/movie/bulk/", items)}, {"updated"})
+            return len(captured)
+
+        self.assertEqual(queries(2), queries(6))
+        self.assertEqual(Movie.objects.filter(series=self.trigun).count(), 6)
+
+
+class ChangeFeedTests(TestCase):
+    def changes(self, since=0, **params):
+        response = self.client.get("/changes/", {"since": since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_follow_the_log_in_seq_order(self):
+        created = [Series.objects.create(name=f"Series {i}", about="", release_year=2000 + i) for i in range(5)]
+
+        seen, since, has_more = [], 0, True
+        while has_more:
+            page = self.changes(since, limit=2)
+            self.assertLessEqual(len(page["changes"]), 2)
+            seen += page["changes"]
+            since, has_more = page["next_since"], page["has_more"]
+
+        self.assertEqual([change["id"] for change in seen], [series.pk for series in created])
+        self.assertEqual([change["seq"] for change in seen], sorted(change["seq"] for change in seen))
+        self.assertEqual(seen[0]["data"]["name"], "Series 0")
+        self.assertEqual(self.changes(since)["changes"], [])
+
+    def test_deleted_objects_leave_a_tombstone(self):
+        kept = Series.objects.create(name="Kept", about="", release_year=2001)
+        since = self.changes()["next_since"]
+        gone = Series.objects.create(name="Gone", about="", release_year=2002)
+        gone_pk = gone.pk
+        gone.delete()
+
+        changes = self.changes(since)["changes"]
+
+        self.assertEqual(changes, [{"seq": changes[0]["seq"], "kind": "series", "id": gone_pk, "action": "delete"}])
+        self.assertTrue(Series.objects.filter(pk=kept.pk).exists())
+
+    def test_repeated_upserts_collapse_to_the_latest(self):
+        series = Series.objects.create(name="Draft", about="", release_year=2001)
+        for name in ("Second", "Final"):
+            series.name = name
+            series.save()
+
+        page = self.changes()
+
+        self.assertEqual(len(page["changes"]), 1)
+        change = page["changes"][0]
+        self.assertEqual((change["id"], change["action"], change["data"]["name"]), (series.pk, "upsert", "Final"))
+        self.assertEqual(change["seq"], page["next_since"])
+
+    @override_settings(CHANGE_FEED_SAFETY_LAG=60)
+    def test_entries_inside_the_safety_lag_are_held_back(self):
+        settled = Series.objects.create(name="Settled", about="", release_year=2001)
+        ChangeLog.objects.update(created_at=timezone.now() - timedelta(seconds=120))
+        settled_seq = ChangeLog.objects.get().seq
+        Series.objects.create(name="Recent", about="", release_year=2002)
+
+        page = self.changes()
+
+        self.assertEqual([change["id"] for change in page["changes"]], [settled.pk])
+        self.assertEqual(page["next_since"], settled_seq)
+        self.assertEqual(self.changes(settled_seq)["next_since"], settled_seq)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        overrides = self.settings(PROFILE_DIR=tempfile.mkdtemp())
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        Series.objects.create(name="Cowboy Bebop", about="", release_year=1998)
+        self.staff = User.objects.create_user("staff", password="x", is_staff=True)
+        self.user = User.objects.create_user("user", password="x")
+
+    def test_only_staff_requests_are_profiled(self):
+        plain = self.client.get("/anime_series/").json()
+        for user in (None, self.user):
+            if user:
+                self.client.force_login(user)
+            for params, headers in (({"_profile": "1"}, {}), ({"_profile": "sample"}, {}), ({}, {"X-Profile": "1"})):
+                with self.subTest(user=user, params=params, headers=headers):
+                    response = self.client.get("/anime_series/", params, headers=headers)
+
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.json(), plain)
+                    self.assertFalse(response.has_header("X-Profile-Id"))
+        self.assertEqual(os.listdir(settings.PROFILE_DIR), [])
+        self.assertEqual(self.client.get("/profiles/").status_code, 403)
+
+    def test_sampled_profile_is_saved_as_speedscope_json(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get("/anime_series/", {"_profile": "sample"})
+
+        self.assertEqual(response.status_code, 200)
+        profile_id = response["X-Profile-Id"]
+        report = self.client.get(f"/profiles/{profile_id}/").json()
+        self.assertEqual(report["mode"], "sample")
+        self.assertEqual((report["path"], report["status"]), ("/anime_series/?_profile=sample", 200))
+        self.assertGreater(report["sql_count"], 0)
+        artifact = self.client.get(f"/profiles/{profile_id}/artifact/")
+        speedscope = json.loads(b"".join(artifact.streaming_content))
+        self.assertEqual(speedscope["$schema"], "https://www.speedscope.app/file-format-schema.json")
+        self.assertEqual(speedscope["profiles"][0]["type"], "sampled")
+        self.assertEqual([r["id"] for r in self.client.get("/profiles/").json()["results"]], [profile_id])
+
+    def test_header_profiles_with_cprofile(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get("/anime_series/", headers={"X-Profile": "1"})
+
+        report = self.client.get(f"/profiles/{response['X-Profile-Id']}/").json()
+        self.assertEqual(report["mode"], "cprofile")
+        self.assertTrue(report["top"])
+        artifact = self.client.get(f"/profiles/{response['X-Profile-Id']}/artifact/")
+        with tempfile.NamedTemporaryFile(suffix=".pstats") as stats:
+            stats.write(b"".join(artifact.streaming_content))
+            stats.flush()
+            self.assertGreater(pstats.Stats(stats.name).total_calls, 0)
@@ -4,10 +4,19 @@ from django.urls import path, include
 urlpatterns = [
     path("anime_series/", views.SeriesView.as_view()),
     path("anime_series/<int:pk>/", views.SeriesView.as_view()),
+    path("anime_series/bulk/", views.SeriesBulkView.as_view()),
     path("anime_ui/", views.series_list_ui, name="anime-list-ui"),
     path("anime_ui/<int:pk>/", views.series_detail_ui, name="anime-detail-ui"),
     path("movie/", views.MovieView.as_view()),
     path("movie/<int:pk>/", views.MovieView.as_view()),
+    path("movie/bulk/", views.MovieBulkView.as_view()),
     path("movie_ui/", views.movie_list_ui, name="movie-list-ui"),
     path("movie_ui/<int:pk>/", views.movie_detail_ui, name="movie-detail-ui"),
+    path("changes/", views.ChangeFeedView.as_view()),
+    path("similar/<str:kind>/<int:pk>/", views.SimilarView.as_view()),
+    path("autocomplete/", views.AutocompleteView.as_view()),
+    path("admission/", views.AdmissionStatsView.as_view()),
+    path("profiles/", views.ProfileListView.as_view()),
+    path("profiles/<str:profile_id>/", views.ProfileDetailView.as_view()),
+    path("profiles/<str:profile_id>/artifact/", views.ProfileArtifactView.as_view()),
 ]
@@ -1,22 +1,38 @@
 import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Series, Movie
+from .singleflight import single_flight, flight_key
+from .profiling import record_provider_call
 from typing import Union
 
-JIKAN_BASE_URL = "https://api.jikan.moe/v4"
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+JIKAN_BASE_URL = settings.JIKAN_BASE_URL
+TMDB_BASE_URL = settings.TMDB_BASE_URL
+OMDB_BASE_URL = settings.OMDB_BASE_URL
 
 OMDB_API_KEY = settings.OMDB_API_KEY
 TMDB_API_KEY = settings.TMDB_API_KEY
 
+def provider_get(provider, url, params=None):
+    start = time.perf_counter()
+    status_code = None
+    try:
+        resp = requests.get(url, params=params)
+        status_code = resp.status_code
+        return resp
+    finally:
+        record_provider_call(provider, url, params, status_code, time.perf_counter() - start)
+
 def fetch_jikan_anime(title):
     url = f"{JIKAN_BASE_URL}/anime"
     params = {"q": title, "limit": 1}
 
     try:
-        resp = requests.get(url, params=params)
+        resp = provider_get("jikan", url, params=params)
         if resp.status_code != 200 or not resp.json().get("data"):
             return None
 
@@ -30,7 +46,7 @@ def fetch_jikan_anime(title):
                 crunchyroll_url = s.get("url")
                 break
 
-        ext_resp = requests.get(f"{JIKAN_BASE_URL}/anime/{anime['mal_id']}/external")
+        ext_resp = provider_get("jikan", f"{JIKAN_BASE_URL}/anime/{anime['mal_id']}/external")
         if ext_resp.status_code == 200:
             for link in ext_resp.json().get("data", []):
                 if "crunchyroll" in link.get("name", "").lower() and not crunchyroll_url:
@@ -51,9 +67,9 @@ def fetch_jikan_anime(title):
 
 def fetch_omdb_imdb_link(title: str):
     try:
-        url = "http://www.omdbapi.com/"
+        url = OMDB_BASE_URL
         params = {"t": title, "apikey": OMDB_API_KEY}
-        resp = requests.get(url, params=params).json()
+        resp = provider_get("omdb", url, params=params).json()
 
         if resp.get("Response") == "True" and resp.get("imdbID"):
             return f"https://www.imdb.com/title/{resp['imdbID']}/"
@@ -74,7 +90,8 @@ def fetch_tmdb_streaming(title: str, media_type="tv", region="US"):
 
     try:
         search_url = f"{TMDB_BASE_URL}/search/{media_type}"
-        search = requests.get(
+        search = provider_get(
+            "tmdb",
             search_url,
             params={"api_key": TMDB_API_KEY, "query": title}
         ).json()
@@ -98,12 +115,17 @@ def populate_series_data(series_input: Union[Series, str]):
     if isinstance(series_input, Series):
         series_obj = series_input
     else:
-        series_obj = Series.objects.filter(name=name).first()
+        series_obj = Series.objects.using(DEFAULT_DB_ALIAS).filter(name=name).first()
 
-    jikan = fetch_jikan_anime(name)
-    streaming = fetch_tmdb_streaming(name, media_type="tv")
+    jikan = single_flight(flight_key("jikan", name), lambda: fetch_jikan_anime(name))
+    streaming = single_flight(
+        flight_key("tmdb", "tv", name), lambda: fetch_tmdb_streaming(name, media_type="tv")
+    )
 
-    imdb = series_obj.imdb_link if series_obj and series_obj.imdb_link else fetch_omdb_imdb_link(name)
+    if series_obj and series_obj.imdb_link:
+        imdb = series_obj.imdb_link
+    else:
+        imdb = single_flight(flight_key("omdb", name), lambda: fetch_omdb_imdb_link(name))
     rt = series_obj.rt_link if series_obj and series_obj.rt_link else generate_rt_link(name, "tv")
 
     crunchyroll_link = jikan.get("crunchyroll") if jikan else None
@@ -135,12 +157,17 @@ def populate_movie_data(movie_input: Union[Movie, str]):
     if isinstance(movie_input, Movie):
         movie_obj = movie_input
     else:
-        movie_obj = Movie.objects.filter(movie_name=name).first()
+        movie_obj = Movie.objects.using(DEFAULT_DB_ALIAS).filter(movie_name=name).first()
 
-    jikan = fetch_jikan_anime(name)
-    streaming = fetch_tmdb_streaming(name, media_type="movie")
+    jikan = single_flight(flight_key("jikan", name), lambda: fetch_jikan_anime(name))
+    streaming = single_flight(
+        flight_key("tmdb", "movie", name), lambda: fetch_tmdb_streaming(name, media_type="movie")
+    )
 
-    imdb = movie_obj.imdb_link if movie_obj and movie_obj.imdb_link else fetch_omdb_imdb_link(name)
+    if movie_obj and movie_obj.imdb_link:
+        imdb = movie_obj.imdb_link
+    else:
+        imdb = single_flight(flight_key("omdb", name), lambda: fetch_omdb_imdb_link(name))
     rt = movie_obj.rt_link if movie_obj and movie_obj.rt_link else generate_rt_link(name, "movie")
 
     crunchyroll_link = jikan.get("crunchyroll") if jikan else None
@@ -165,6 +192,27 @@ def populate_movie_data(movie_input: Union[Movie, str]):
         **streaming,
     }
 
+_enrichment_executor = ThreadPoolExecutor(
+    max_workers=settings.ENRICHMENT_BACKGROUND_WORKERS, thread_name_prefix="enrichment"
+)
+
+
+def schedule_enrichment(model, pks):
+    populate = populate_series_data if model is Series else populate_movie_data
+
+    def run(pk):
+        try:
+            obj = model.objects.using(DEFAULT_DB_ALIAS).filter(pk=pk).first()
+            if obj:
+                populate(obj)
+        except Exception as e:
+            print("Background enrichment error:", e)
+        finally:
+            connection.close()
+
+    for pk in pks:
+        _enrichment_executor.submit(run, pk)
+
 def get_obj_or_404(model, pk):
     if not pk:
         return None, Response({"error": "Primary key required"}, status=status.HTTP_400_BAD_REQUEST)
@@ -172,3 +220,25 @@ def get_obj_or_404(model, pk):
         return model.objects.get(pk=pk), None
     except model.DoesNotExist:
         return None, Response({"error": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+
+# largest value of a BigAutoField (and of SQLite's INTEGER)
+MAX_ID = 2**63 - 1
+
+
+def parse_ids(raw):
+    """"1,2,3" -> ([1, 2, 3], None), deduplicated in request order."""
+    ids = []
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        # isdigit() alone accepts non-ASCII digits ("²") that int() rejects
+        if not (part.isascii() and part.isdigit()) or int(part) > MAX_ID:
+            return None, {"ids": [f"Invalid id: {part}"]}
+        ids.append(int(part))
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return None, {"ids": ["At least one id is required."]}
+    if len(ids) > settings.MULTI_GET_MAX_IDS:
+        return None, {"ids": [f"At most {settings.MULTI_GET_MAX_IDS} ids per request."]}
+    return ids, None
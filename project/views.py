@@ -1,29 +1,64 @@
+from datetime import timedelta
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.permissions import IsAdminUser
 from django.shortcuts import render, get_object_or_404
+from django.urls import reverse
+from django.conf import settings
 from django.core.paginator import Paginator
-from .models import Series, Movie
+from django.http import FileResponse
+from django.utils import timezone
+from .models import Series, Movie, ChangeLog
 from .serializers import SeriesSerializer, MovieSerializer
 from .filters import SeriesFilter, MovieFilter
-from .utils import get_obj_or_404
+from .utils import get_obj_or_404, parse_ids
+from .bulk import bulk_update_objects
+from .similarity import get_index
+from . import autocomplete
+from .admission import EnrichmentRateThrottle, admission_controlled, stats as admission_stats
+from .idempotency import idempotent
+from . import profiling
+from .readmodel import embed_movies, ordered_ids, representations
 
 # ------------------ SERIES VIEW ------------------ #
 
 class SeriesView(APIView):
     searching_fields = ["name", "genre"]
     ordering_fields = ["release_year"]
+    throttle_classes = [EnrichmentRateThrottle]
 
     # GET
     def get(self, request, pk=None):
+        fields, fields_error = SeriesSerializer.parse_fields(request.GET.get("fields"))
+        if fields_error:
+            return Response(fields_error, status=status.HTTP_400_BAD_REQUEST)
+        expand, expand_error = self.parse_expand(request.GET.get("expand"))
+        if expand_error:
+            return Response(expand_error, status=status.HTTP_400_BAD_REQUEST)
+
+        def render(ids):
+            rows = representations(Series, SeriesSerializer, ids, fields)
+            if "movies" in expand:
+                embed_movies(rows, settings.EXPAND_MOVIES_LIMIT)
+            return rows
+
         if pk:
-            obj, error = get_obj_or_404(Series, pk)
-            if error:
-                return error
-            serializer = SeriesSerializer(obj)
-            return Response(serializer.data)
+            data = render([pk])
+            if not data:
+                return Response({"error": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response(data[0])
+
+        if "ids" in request.GET:
+            ids, ids_error = parse_ids(request.GET["ids"])
+            if ids_error:
+                return Response(ids_error, status=status.HTTP_400_BAD_REQUEST)
+            results = render(ids)
+            found = {data["id"] for data in results}
+            return Response({"results": results, "missing": [pk for pk in ids if pk not in found]})
 
         queryset = Series.objects.all().distinct()
         filterset = SeriesFilter(request.GET, queryset=queryset)
@@ -39,11 +74,20 @@ class SeriesView(APIView):
 
         paginator = PageNumberPagination()
         paginator.page_size = 3
-        result_page = paginator.paginate_queryset(queryset, request)
-        serializer = SeriesSerializer(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        page_ids = paginator.paginate_queryset(ordered_ids(queryset), request)
+        return paginator.get_paginated_response(render(page_ids))
+
+    @staticmethod
+    def parse_expand(raw):
+        expand = {name.strip() for name in (raw or "").split(",") if name.strip()}
+        unknown = sorted(expand - {"movies"})
+        if unknown:
+            return None, {"expand": [f"Unknown expansion: {name}" for name in unknown]}
+        return expand, None
 
     # POST
+    @idempotent(Series, SeriesSerializer)
+    @admission_controlled
     def post(self, request, pk=None):
         if pk:
             return Response({"error": "POST cannot work with a primary key"}, status=status.HTTP_400_BAD_REQUEST)
@@ -87,15 +131,27 @@ class SeriesView(APIView):
 class MovieView(APIView):
     searching_fields = ["movie_name", "genre"]
     ordering_fields = ["release_year"]
+    throttle_classes = [EnrichmentRateThrottle]
 
     # GET
     def get(self, request, pk=None):
+        fields, fields_error = MovieSerializer.parse_fields(request.GET.get("fields"))
+        if fields_error:
+            return Response(fields_error, status=status.HTTP_400_BAD_REQUEST)
+
         if pk:
-            obj, error = get_obj_or_404(Movie, pk)
-            if error:
-                return error
-            serializer = MovieSerializer(obj)
-            return Response(serializer.data)
+            data = representations(Movie, MovieSerializer, [pk], fields)
+            if not data:
+                return Response({"error": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response(data[0])
+
+        if "ids" in request.GET:
+            ids, ids_error = parse_ids(request.GET["ids"])
+            if ids_error:
+                return Response(ids_error, status=status.HTTP_400_BAD_REQUEST)
+            results = representations(Movie, MovieSerializer, ids, fields)
+            found = {data["id"] for data in results}
+            return Response({"results": results, "missing": [pk for pk in ids if pk not in found]})
 
         queryset = Movie.objects.all()
         filterset = MovieFilter(request.GET, queryset=queryset)
@@ -111,11 +167,12 @@ class MovieView(APIView):
 
         paginator = PageNumberPagination()
         paginator.page_size = 3
-        result_page = paginator.paginate_queryset(queryset, request)
-        serializer = MovieSerializer(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        page_ids = paginator.paginate_queryset(ordered_ids(queryset), request)
+        return paginator.get_paginated_response(representations(Movie, MovieSerializer, page_ids, fields))
 
     # POST
+    @idempotent(Movie, MovieSerializer)
+    @admission_controlled
     def post(self, request, pk=None):
         if pk:
             return Response({"error": "POST cannot work with a primary key"}, status=status.HTTP_400_BAD_REQUEST)
@@ -155,6 +212,187 @@ class MovieView(APIView):
         return Response({"message": "Object deleted successfully"}, status=status.HTTP_200_OK)
 
 
+# ------------------ BULK UPDATE VIEWS ------------------ #
+
+class SeriesBulkView(APIView):
+    def patch(self, request):
+        results, error = bulk_update_objects(Series, SeriesSerializer, request.data, partial=True)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": results}, status=status.HTTP_202_ACCEPTED)
+
+    def put(self, request):
+        results, error = bulk_update_objects(Series, SeriesSerializer, request.data, partial=False)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": results}, status=status.HTTP_202_ACCEPTED)
+
+
+class MovieBulkView(APIView):
+    def patch(self, request):
+        results, error = bulk_update_objects(Movie, MovieSerializer, request.data, partial=True)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": results}, status=status.HTTP_202_ACCEPTED)
+
+    def put(self, request):
+        results, error = bulk_update_objects(Movie, MovieSerializer, request.data, partial=False)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": results}, status=status.HTTP_202_ACCEPTED)
+
+
+# ------------------ CHANGE FEED ------------------ #
+
+class ChangeFeedView(APIView):
+    feed_serializers = {"series": (Series, SeriesSerializer), "movie": (Movie, MovieSerializer)}
+
+    def get(self, request):
+        try:
+            since = int(request.GET.get("since", 0))
+            limit = int(request.GET.get("limit", settings.CHANGE_FEED_PAGE_SIZE))
+        except ValueError:
+            return Response({"error": "since and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.CHANGE_FEED_MAX_PAGE_SIZE))
+
+        entries = ChangeLog.objects.filter(seq__gt=since)
+        if settings.CHANGE_FEED_SAFETY_LAG:
+            # see CHANGE_FEED_SAFETY_LAG: wait for in-flight lower seqs to commit
+            cutoff = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_SAFETY_LAG)
+            entries = entries.filter(created_at__lte=cutoff)
+        entries = list(entries.order_by("seq")[:limit])
+
+        # Only the newest entry per object matters; upserts carry current state
+        latest = {}
+        for entry in entries:
+            latest.pop((entry.kind, entry.object_id), None)
+            latest[(entry.kind, entry.object_id)] = entry
+
+        current = {}
+        for kind, (model, serializer_class) in self.feed_serializers.items():
+            ids = [e.object_id for e in latest.values() if e.kind == kind and e.action == ChangeLog.UPSERT]
+            if ids:
+                current[kind] = {data["id"]: data for data in representations(model, serializer_class, ids)}
+
+        changes = []
+        for entry in latest.values():
+            data = current.get(entry.kind, {}).get(entry.object_id)
+            change = {"seq": entry.seq, "kind": entry.kind, "id": entry.object_id}
+            if data is None:
+                change["action"] = ChangeLog.DELETE
+            else:
+                change["action"] = ChangeLog.UPSERT
+                change["data"] = data
+            changes.append(change)
+
+        return Response({
+            "changes": changes,
+            "next_since": entries[-1].seq if entries else since,
+            "has_more": len(entries) == limit,
+        })
+
+
+# ------------------ SIMILAR TITLES ------------------ #
+
+class SimilarView(APIView):
+    similar_serializers = {"series": (Series, SeriesSerializer), "movie": (Movie, MovieSerializer)}
+
+    def get(self, request, kind, pk):
+        if kind not in self.similar_serializers:
+            return Response({"error": "Unknown type"}, status=status.HTTP_404_NOT_FOUND)
+        model, serializer_class = self.similar_serializers[kind]
+
+        fields, fields_error = serializer_class.parse_fields(request.GET.get("fields"))
+        if fields_error:
+            return Response(fields_error, status=status.HTTP_400_BAD_REQUEST)
+        if not model.objects.filter(pk=pk).exists():
+            return Response({"error": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        neighbours = get_index(kind).similar(pk)
+        if neighbours is None:
+            return Response({"error": "Similarity index is being built"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        rendered = representations(model, serializer_class, [other for other, _ in neighbours], fields)
+        rows = {data["id"]: data for data in rendered}
+        results = [{"score": round(score, 4), **rows[other]} for other, score in neighbours if other in rows]
+        return Response({"id": pk, "results": results})
+
+
+def similar_objects(kind, pk, limit=None):
+    model = SimilarView.similar_serializers[kind][0]
+    neighbours = get_index(kind).similar(pk, limit or settings.SIMILARITY_UI_LIMIT)
+    ids = [other for other, _ in neighbours or []]
+    objs = model.objects.in_bulk(ids)
+    return [objs[other] for other in ids if other in objs]
+
+
+# ------------------ AUTOCOMPLETE ------------------ #
+
+class AutocompleteView(APIView):
+    detail_urls = {"series": "anime-detail-ui", "movie": "movie-detail-ui"}
+
+    def get(self, request):
+        kind = request.GET.get("type") or None
+        if kind is not None and kind not in self.detail_urls:
+            return Response({"error": "type must be series or movie"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.GET.get("limit", 8))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.AUTOCOMPLETE_MAX_LIMIT))
+
+        matches = autocomplete.get_index().search(request.GET.get("q", ""), limit, kind)
+        results = [
+            {
+                "type": match_kind,
+                "id": pk,
+                "title": title,
+                "release_year": release_year,
+                "url": reverse(self.detail_urls[match_kind], args=[pk]),
+            }
+            for match_kind, pk, title, release_year, _ in matches
+        ]
+        return Response({"results": results})
+
+
+# ------------------ ADMISSION STATS ------------------ #
+
+class AdmissionStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(admission_stats())
+
+
+# ------------------ REQUEST PROFILES ------------------ #
+
+class ProfileListView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({"results": profiling.list_profiles()})
+
+
+class ProfileDetailView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id):
+        report = profiling.load_report(profile_id)
+        if report is None:
+            return Response({"error": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+        report["artifact"] = request.build_absolute_uri(f"/profiles/{profile_id}/artifact/")
+        return Response(report)
+
+
+class ProfileArtifactView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id):
+        path = profiling.artifact_path(profile_id)
+        if path is None:
+            return Response({"error": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=path.name)
+
+
 # Rendering For Series UI
 
 def series_list_ui(request):
@@ -173,7 +411,8 @@ def series_list_ui(request):
 
 def series_detail_ui(request, pk):
     series = get_object_or_404(Series, pk=pk)
-    return render(request, "anime/series_detail.html", {"series": series})
+    context = {"series": series, "similar": similar_objects("series", series.pk)}
+    return render(request, "anime/series_detail.html", context)
 
 # Rendering For Movie UI
 
@@ -193,4 +432,5 @@ def movie_list_ui(request):
 
 def movie_detail_ui(request, pk):
     movie = get_object_or_404(Movie, pk=pk)
-    return render(request, "movie/movie_detail.html", {"movie": movie})
\ No newline at end of file
+    context = {"movie": movie, "similar": similar_objects("movie", movie.pk)}
+    return render(request, "movie/movie_detail.html", context)
\ No newline at end of file
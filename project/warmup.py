@@ -0,0 +1,76 @@
+import json
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+
+from . import autocomplete, similarity
+
+REQUEST_LINE = re.compile(r'"(?:GET|HEAD) (\S+) HTTP/[\d.]+"')
+
+
+def paths_from_log(path, top):
+    counts = Counter()
+    with open(path, encoding="utf-8", errors="replace") as log:
+        for line in log:
+            match = REQUEST_LINE.search(line)
+            if match and match.group(1).startswith(tuple(settings.CACHE_WARM_PREFIXES)):
+                counts[match.group(1)] += 1
+    return [path for path, _ in counts.most_common(top)]
+
+
+def paths_from_config(path, top):
+    with open(path, encoding="utf-8") as config:
+        data = json.load(config)
+    paths = data["paths"] if isinstance(data, dict) else data
+    return list(paths)[:top]
+
+
+def warm_indexes():
+    """Load this process's /autocomplete/ and /similar/ indexes, so the
+    first lookup after a fork does not pay for it."""
+    autocomplete.get_index()
+    for kind in similarity.MODELS:
+        index = similarity.get_index(kind)
+        with index.lock:
+            index.refresh()
+
+
+def warm(paths, workers=8, base_url=None):
+    """Load the in-process indexes, then replay GET ``paths`` in parallel,
+    in-process through the full middleware stack, or against ``base_url``
+    when given (whose indexes are its own). Returns per-path (status, ms)."""
+    if not base_url:
+        warm_indexes()
+
+    def fetch(path):
+        start = time.perf_counter()
+        try:
+            if base_url:
+                status = requests.get(base_url.rstrip("/") + path, timeout=30).status_code
+            else:
+                status = Client(HTTP_HOST=settings.CACHE_WARM_HOST).get(path).status_code
+        except Exception as e:
+            print("Warm-up error:", path, e)
+            status = None
+        finally:
+            # the test Client does not send request_finished's connection
+            # cleanup, and pool threads would keep (pooled) connections open
+            connections.close_all()
+        return path, status, (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fetch, paths))
+
+
+def warm_from_settings():
+    if settings.CACHE_WARM_LOG:
+        paths = paths_from_log(settings.CACHE_WARM_LOG, settings.CACHE_WARM_TOP)
+    else:
+        paths = settings.CACHE_WARM_PATHS[: settings.CACHE_WARM_TOP]
+    return warm(paths, workers=settings.CACHE_WARM_WORKERS)
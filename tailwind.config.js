@@ -0,0 +1,8 @@
+/** Purge list for `manage.py build_assets`: only classes used here end up in the bundle. */
+module.exports = {
+  content: ["./project/templates/**/*.html", "./templates/**/*.html"],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};